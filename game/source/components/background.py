@@ -0,0 +1,141 @@
+__author__ = "marble_xu"
+
+import weakref
+import pygame as pg
+from collections import OrderedDict
+from .. import setup
+from .. import constants as c
+
+
+class Background:
+    """level background cut into screen wide tiles
+
+    a tile is scaled when the viewport comes close to it and the least
+    recently used tiles are dropped, so the memory doesn't depend on the
+    length of the level. tiles are cut from the pre-scaled pixels of the
+    asset cache, or scaled from the source image if there is no cache.
+    """
+
+    def __init__(
+        self,
+        name,
+        scale=c.BACKGROUND_MULTIPLER,
+        tile_width=c.BACKGROUND_TILE_WIDTH,
+        max_tiles=c.BACKGROUND_MAX_TILES,
+    ):
+        self.name = name
+        self.scale = scale
+        self.tile_width = tile_width
+        self.max_tiles = max_tiles
+        self.tiles = OrderedDict()
+
+        self.mapped = setup.ASSET_CACHE.map(name, scale)
+        self.unmap = None
+        if self.mapped is not None:
+            self.unmap = weakref.finalize(self, self.mapped[0].close)
+            self.rect = pg.Rect((0, 0), self.mapped[1]["size"])
+        else:
+            source_rect = self.source.get_rect()
+            self.rect = pg.Rect(
+                0, 0, int(source_rect.w * scale), int(source_rect.h * scale)
+            )
+        self.tile_num = (self.rect.w + tile_width - 1) // tile_width
+
+    @property
+    def source(self):
+        """the unscaled image, only loaded when a tile is scaled from it or
+        the level is drawn at native resolution"""
+        return setup.GFX[self.name]
+
+    def get_tile(self, index):
+        tile = self.tiles.get(index)
+        if tile is None:
+            tile = self.create_tile(index)
+            self.tiles[index] = tile
+            if len(self.tiles) > self.max_tiles:
+                self.tiles.popitem(last=False)
+        else:
+            self.tiles.move_to_end(index)
+        return tile
+
+    def close(self):
+        """unmap the cached pixels, tiles are scaled from the source after"""
+        if self.mapped is not None:
+            self.unmap()
+            self.mapped = None
+
+    def create_tile(self, index):
+        x = index * self.tile_width
+        width = min(self.tile_width, self.rect.w - x)
+        if self.mapped is not None:
+            tile = self.cut_tile(x, width)
+            if tile is not None:
+                return tile
+
+        # column x of the level scaled as a whole shows the source column
+        # x * source width // scaled width, scale the source columns of the
+        # tile to its width. a column may be off by one source column from
+        # the cached tiles, which are cut from the level scaled as a whole
+        source_w = self.source.get_width()
+        first = x * source_w // self.rect.w
+        last = (x + width - 1) * source_w // self.rect.w
+        return pg.transform.scale(
+            self.source.subsurface(
+                (first, 0, last + 1 - first, self.source.get_height())
+            ),
+            (width, self.rect.h),
+        )
+
+    def cut_tile(self, x, width):
+        buffer, entry = self.mapped
+        bytesize = len(entry["format"])
+        if len(buffer) != self.rect.w * self.rect.h * bytesize:
+            # the cache file doesn't hold this image, scale it instead
+            self.close()
+            return None
+        pitch = self.rect.w * bytesize
+        start = x * bytesize
+        end = start + width * bytesize
+        pixels = b"".join(
+            buffer[row * pitch + start : row * pitch + end]
+            for row in range(self.rect.h)
+        )
+        tile = pg.image.frombuffer(pixels, (width, self.rect.h), entry["format"])
+        if entry["format"] == "RGBA":
+            return tile.convert_alpha()
+        tile = tile.convert()
+        if entry["colorkey"] is not None:
+            tile.set_colorkey(entry["colorkey"])
+        return tile
+
+    def prefetch(self, viewport):
+        """scale the tiles next to the viewport before they become visible"""
+        left = (viewport.left - c.BACKGROUND_PREFETCH) // self.tile_width
+        right = (viewport.right + c.BACKGROUND_PREFETCH) // self.tile_width
+        for index in (left, right):
+            if 0 <= index < self.tile_num and index not in self.tiles:
+                self.get_tile(index)
+
+    def draw(self, surface, viewport, dest=(0, 0)):
+        """blit the part of the background inside viewport to surface at dest"""
+        first = max(0, viewport.left // self.tile_width)
+        last = min(self.tile_num - 1, (viewport.right - 1) // self.tile_width)
+        for index in range(first, last + 1):
+            x = index * self.tile_width
+            area = viewport.clip(pg.Rect(x, 0, self.tile_width, self.rect.h))
+            surface.blit(
+                self.get_tile(index),
+                (dest[0] + area.x - viewport.x, dest[1] + area.y - viewport.y),
+                area.move(-x, 0),
+            )
+        self.prefetch(viewport)
+
+    def draw_native(self, surface, viewport):
+        """blit the part of the unscaled source inside viewport to surface"""
+        area = pg.Rect(
+            round(viewport.x / self.scale),
+            round(viewport.y / self.scale),
+            surface.get_width(),
+            surface.get_height(),
+        )
+        surface.blit(self.source, (0, 0), area)
@@ -80,4 +80,6 @@ class Box(pg.sprite.Sprite):
         self.state = c.BUMPED
 
         if self.type == c.TYPE_COIN:
-            self.group.add(coin.Coin(self.rect.centerx, self.rect.y, score_group))
+            self.group.add(
+                coin.coin_pool.acquire(self.rect.centerx, self.rect.y, score_group)
+            )
@@ -98,7 +98,9 @@ class Brick(stuff.Stuff):
 
         if self.type == c.TYPE_COIN:
             if self.coin_num > 0:
-                self.group.add(coin.Coin(self.rect.centerx, self.rect.y, score_group))
+                self.group.add(
+                    coin.coin_pool.acquire(self.rect.centerx, self.rect.y, score_group)
+                )
                 self.coin_num -= 1
                 if self.coin_num == 0:
                     self.frame_index = 1
@@ -122,18 +124,23 @@ class Brick(stuff.Stuff):
         ]
 
         for arg in arg_list:
-            group.add(BrickPiece(*arg))
+            group.add(piece_pool.acquire(*arg))
         self.kill()
 
 
-class BrickPiece(stuff.Stuff):
-    def __init__(self, x, y, x_vel, y_vel):
+class BrickPiece(tools.Pooled, stuff.Stuff):
+    def __init__(self, x=0, y=0, x_vel=0, y_vel=0):
         stuff.Stuff.__init__(
             self, x, y, setup.GFX["tile_set"], [(68, 20, 8, 8)], c.BRICK_SIZE_MULTIPLIER
         )
+        self.gravity = 0.8
+        self.reset(x, y, x_vel, y_vel)
+
+    def reset(self, x, y, x_vel, y_vel):
+        self.rect.x = x
+        self.rect.y = y
         self.x_vel = x_vel
         self.y_vel = y_vel
-        self.gravity = 0.8
 
     def update(self, *args):
         self.rect.x += self.x_vel
@@ -141,3 +148,6 @@ class BrickPiece(stuff.Stuff):
         self.y_vel += self.gravity
         if self.rect.y > c.SCREEN_HEIGHT:
             self.kill()
+
+
+piece_pool = tools.SpritePool(BrickPiece)
@@ -5,15 +5,18 @@ from .. import setup, tools
 from .. import constants as c
 
 
-class Coin(pg.sprite.Sprite):
-    def __init__(self, x, y, score_group):
+class Coin(tools.Pooled, pg.sprite.Sprite):
+    def __init__(self, x=0, y=0, score_group=None):
         pg.sprite.Sprite.__init__(self)
 
         self.frames = []
-        self.frame_index = 0
         self.load_frames()
+        self.rect = self.frames[0].get_rect()
+        self.reset(x, y, score_group)
+
+    def reset(self, x, y, score_group):
+        self.frame_index = 0
         self.image = self.frames[self.frame_index]
-        self.rect = self.image.get_rect()
         self.rect.centerx = x
         self.rect.bottom = y - 5
         self.gravity = 1
@@ -55,6 +58,9 @@ class Coin(pg.sprite.Sprite):
             self.kill()
 
 
+coin_pool = tools.SpritePool(Coin)
+
+
 class FlashCoin(pg.sprite.Sprite):
     def __init__(self, x, y):
         pg.sprite.Sprite.__init__(self)
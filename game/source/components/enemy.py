@@ -5,6 +5,11 @@ import pygame as pg
 from .. import setup, tools
 from .. import constants as c
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 ENEMY_SPEED = 1
 
 
@@ -58,7 +63,212 @@ def create_enemy(item, level):
     return sprite
 
 
-class Enemy(pg.sprite.Sprite):
+def update_enemies(group, game_info, level):
+    """update the sprites of the enemy group
+
+    the walking and falling enemies which use the movement of Enemy are
+    moved together in numpy arrays by move_batch when there are enough of
+    them. they can't affect each other or the level while they move, so the
+    result is the same as updating them one after another. a sliding shell
+    kills other enemies, then every sprite is updated on its own.
+    """
+    sprites = group.sprites()
+    batch = []
+    if np is not None and c.ENEMY_BATCH_PHYSICS:
+        if all(getattr(sprite, "state", None) != c.SHELL_SLIDE for sprite in sprites):
+            batch = [sprite for sprite in sprites if can_batch(sprite)]
+        if len(batch) < c.ENEMY_BATCH_SIZE:
+            batch = []
+
+    if batch:
+        current_time = game_info[c.CURRENT_TIME]
+        gravity = []
+        for sprite in batch:
+            sprite.current_time = current_time
+            if sprite.state == c.FALL and type(sprite).falling is Enemy.falling:
+                gravity.append(True)
+            else:
+                gravity.append(False)
+                sprite.handle_state()
+            sprite.animation()
+        move_batch(batch, gravity, level)
+
+    batched = set(batch)
+    for sprite in sprites:
+        if sprite not in batched:
+            sprite.update(game_info, level)
+
+
+BATCH_METHODS = (
+    "update",
+    "update_position",
+    "check_x_collisions",
+    "check_y_collisions",
+)
+batch_classes = {}
+
+
+def can_batch(sprite):
+    cls = type(sprite)
+    if cls not in batch_classes:
+        batch_classes[cls] = issubclass(cls, Enemy) and all(
+            getattr(cls, name) is getattr(Enemy, name) for name in BATCH_METHODS
+        )
+    return batch_classes[cls] and sprite.state in (c.WALK, c.FLY, c.FALL)
+
+
+def round_rect(value):
+    """round like pygame does when a float is assigned to a Rect attribute"""
+    whole = np.trunc(value)
+    return whole + np.sign(value) * (np.abs(value - whole) >= 0.5)
+
+
+def collide_first(x, y, w, h, solids, mask):
+    """index of the first solid which collides with each rect, -1 if none"""
+    sx, sy, sw, sh = solids
+    hits = (
+        mask
+        & (x[:, None] < sx + sw)
+        & (x[:, None] + w[:, None] > sx)
+        & (y[:, None] < sy + sh)
+        & (y[:, None] + h[:, None] > sy)
+    )
+    return np.where(hits.any(axis=1), hits.argmax(axis=1), -1)
+
+
+def move_batch(sprites, gravity, level):
+    """Enemy.falling gravity and Enemy.update_position for all the sprites"""
+    data = np.array(
+        [
+            (
+                *sprite.rect,
+                sprite.x_vel,
+                sprite.y_vel,
+                sprite.gravity,
+                sprite.in_range,
+                sprite.isVertical,
+                sprite.range_start,
+                sprite.range_end,
+                sprite.direction == c.RIGHT,
+                sprite.direction == c.LEFT,
+                sprite.state == c.FLY,
+            )
+            for sprite in sprites
+        ],
+        float,
+    ).T
+    x, y, w, h, x_vel, y_vel, sprite_gravity = data[:7]
+    in_range, vertical = data[7:9].astype(bool)
+    range_start, range_end = data[9:11]
+    right, left, fly = data[11:].astype(bool)
+
+    # only the solids around the batch can be hit. the area covers the moves,
+    # the ends of the ranges a sprite is put back to and a sprite pushed out
+    # of a solid by up to its size
+    reach_x = np.abs(x_vel) + 1
+    reach_y = np.abs(y_vel) + np.abs(sprite_gravity) + ENEMY_SPEED + 1
+    ranged_x = in_range & ~vertical
+    ranged_y = in_range & vertical
+    area_left = np.append(x - reach_x, range_start[ranged_x]).min() - w.max()
+    area_right = np.append(x + w + reach_x, range_end[ranged_x]).max() + w.max()
+    area_top = np.append(y - reach_y, range_start[ranged_y]).min() - h.max()
+    area_bottom = np.append(y + h + reach_y, range_end[ranged_y]).max() + h.max()
+    area = pg.Rect(math.floor(area_left), math.floor(area_top), 0, 0)
+    area.w = math.ceil(area_right) - area.x
+    area.h = math.ceil(area_bottom) - area.y
+    solid_sprites = level.solids.query(area)
+
+    # the zero size rect at the end keeps the arrays from being empty
+    solids = [tuple(sprite.rect) for sprite in solid_sprites] + [(0, 0, 0, 0)]
+    solids = tuple(np.array(solids, float).T)
+    valid = (solids[2] > 0) & (solids[3] > 0)
+    # the enemies only check the ground, step and pipe sprites in x
+    ground_step_pipe = valid & np.array(
+        [sprite in level.ground_step_pipe_group for sprite in solid_sprites] + [False],
+        bool,
+    )
+    slider = np.array(
+        [sprite.name == c.MAP_SLIDER for sprite in solid_sprites] + [False], bool
+    )
+
+    # falling
+    gravity = np.array(gravity, bool) & (y_vel < 10)
+    y_vel = np.where(gravity, y_vel + sprite_gravity, y_vel)
+
+    # check_x_collisions
+    x = round_rect(x + x_vel)
+    ranged = in_range & ~vertical
+    turn_right = ranged & (x < range_start)
+    x = np.where(turn_right, range_start, x)
+    turn_left = ranged & ~turn_right & (x + w > range_end)
+    x = np.where(turn_left, range_end - w, x)
+    hit = collide_first(x, y, w, h, solids, ground_step_pipe & ~ranged[:, None])
+    collided = hit >= 0
+    hit_left = collided & right
+    hit_right = collided & left
+    x = np.where(hit_left, solids[0][hit] - w, x)
+    x = np.where(hit_right, solids[0][hit] + solids[2][hit], x)
+    turn_right |= hit_right
+    turn_left |= hit_left
+
+    # vertical range
+    ranged = in_range & vertical
+    move_down = ranged & (y < range_start)
+    y = np.where(move_down, range_start, y)
+    move_up = ranged & ~move_down & (y + h > range_end)
+    y = np.where(move_up, range_end - h, y)
+    y_vel = np.where(move_down, ENEMY_SPEED, np.where(move_up, -ENEMY_SPEED, y_vel))
+    y = round_rect(y + y_vel)
+
+    # check_y_collisions, the flying ones don't check
+    mask = (
+        np.where((y + h >= c.GROUND_HEIGHT)[:, None], ground_step_pipe, valid)
+        & ~fly[:, None]
+    )
+    hit = collide_first(x, y, w, h, solids, mask)
+    landed = (hit >= 0) & ~slider[hit] & (y <= solids[1][hit])
+    y = np.where(landed, solids[1][hit] - h, y)
+
+    # check_is_falling
+    falling = np.zeros(len(sprites), bool)
+    if not level.in_frozen_state():
+        mask = valid & ~fly[:, None]
+        falling = ~fly & (collide_first(x, y + 1, w, h, solids, mask) < 0)
+
+    bottom = level.viewport.bottom
+    for i, sprite in enumerate(sprites):
+        if turn_right[i]:
+            sprite.change_direction(c.RIGHT)
+        elif turn_left[i]:
+            sprite.change_direction(c.LEFT)
+        sprite.rect.x = int(x[i])
+        sprite.rect.y = int(y[i])
+        if gravity[i]:
+            sprite.y_vel = float(y_vel[i])
+        if move_down[i]:
+            sprite.y_vel = ENEMY_SPEED
+        elif move_up[i]:
+            sprite.y_vel = -1 * ENEMY_SPEED
+        if landed[i]:
+            sprite.y_vel = 0
+            sprite.state = c.WALK
+        if falling[i]:
+            sprite.state = c.FALL
+        if x[i] <= 0 or y[i] > bottom:
+            sprite.kill()
+
+
+class Enemy(tools.StateMachine, pg.sprite.Sprite):
+    state_methods = {
+        c.WALK: "walking",
+        c.FLY: "walking",
+        c.FALL: "falling",
+        c.JUMPED_ON: "jumped_on",
+        c.DEATH_JUMP: "death_jumping",
+        c.SHELL_SLIDE: "shell_sliding",
+        c.REVEAL: "revealing",
+    }
+
     def __init__(self):
         pg.sprite.Sprite.__init__(self)
 
@@ -97,9 +307,10 @@ class Enemy(pg.sprite.Sprite):
 
     def load_frames(self, sheet, frame_rect_list):
         for frame_rect in frame_rect_list:
-            self.frames.append(
-                tools.get_image(sheet, *frame_rect, c.BLACK, c.SIZE_MULTIPLIER)
-            )
+            self.frames.append(self.get_frame(sheet, frame_rect))
+
+    def get_frame(self, sheet, frame_rect, flip=(False, False)):
+        return tools.get_image(sheet, *frame_rect, c.BLACK, c.SIZE_MULTIPLIER, flip)
 
     def set_velocity(self):
         if self.isVertical:
@@ -115,20 +326,6 @@ class Enemy(pg.sprite.Sprite):
         self.animation()
         self.update_position(level)
 
-    def handle_state(self):
-        if self.state == c.WALK or self.state == c.FLY:
-            self.walking()
-        elif self.state == c.FALL:
-            self.falling()
-        elif self.state == c.JUMPED_ON:
-            self.jumped_on()
-        elif self.state == c.DEATH_JUMP:
-            self.death_jumping()
-        elif self.state == c.SHELL_SLIDE:
-            self.shell_sliding()
-        elif self.state == c.REVEAL:
-            self.revealing()
-
     def walking(self):
         if (self.current_time - self.animate_timer) > 125:
             if self.direction == c.RIGHT:
@@ -173,6 +370,13 @@ class Enemy(pg.sprite.Sprite):
         self.frame_index = 3
         self.state = c.DEATH_JUMP
 
+    def load_flipped_frames(self, sheet, frame_rect_list):
+        # dead jump image
+        self.frames.append(self.get_frame(sheet, frame_rect_list[2], (False, True)))
+        # right walk images
+        self.frames.append(self.get_frame(sheet, frame_rect_list[0], (True, False)))
+        self.frames.append(self.get_frame(sheet, frame_rect_list[1], (True, False)))
+
     def animation(self):
         self.image = self.frames[self.frame_index]
 
@@ -206,7 +410,7 @@ class Enemy(pg.sprite.Sprite):
                 self.rect.right = self.range_end
                 self.change_direction(c.LEFT)
         else:
-            collider = pg.sprite.spritecollideany(self, level.ground_step_pipe_group)
+            collider = level.ground_step_pipe_hash.collideany(self)
             if collider:
                 if self.direction == c.RIGHT:
                     self.rect.right = collider.rect.left
@@ -216,7 +420,7 @@ class Enemy(pg.sprite.Sprite):
                     self.change_direction(c.RIGHT)
 
         if self.state == c.SHELL_SLIDE:
-            enemy = pg.sprite.spritecollideany(self, level.enemy_group)
+            enemy = level.enemy_index.collideany(self)
             if enemy:
                 level.update_score(100, enemy, 0)
                 level.move_to_dying_group(level.enemy_group, enemy)
@@ -236,12 +440,9 @@ class Enemy(pg.sprite.Sprite):
     def check_y_collisions(self, level):
         # decrease runtime delay: when enemey is on the ground, don't check brick and box
         if self.rect.bottom >= c.GROUND_HEIGHT:
-            sprite_group = level.ground_step_pipe_group
+            sprite = level.ground_step_pipe_hash.collideany(self)
         else:
-            sprite_group = pg.sprite.Group(
-                level.ground_step_pipe_group, level.brick_group, level.box_group
-            )
-        sprite = pg.sprite.spritecollideany(self, sprite_group)
+            sprite = level.solids.collideany(self)
         if sprite and sprite.name != c.MAP_SLIDER:
             if self.rect.top <= sprite.rect.top:
                 self.rect.bottom = sprite.rect.y
@@ -267,11 +468,7 @@ class Goomba(Enemy):
             range_start,
             range_end,
         )
-        # dead jump image
-        self.frames.append(pg.transform.flip(self.frames[2], False, True))
-        # right walk images
-        self.frames.append(pg.transform.flip(self.frames[0], True, False))
-        self.frames.append(pg.transform.flip(self.frames[1], True, False))
+        self.load_flipped_frames(setup.GFX[c.ENEMY_SHEET], frame_rect_list)
 
     def get_frame_rect(self, color):
         if color == c.COLOR_TYPE_GREEN:
@@ -306,11 +503,7 @@ class Koopa(Enemy):
             range_start,
             range_end,
         )
-        # dead jump image
-        self.frames.append(pg.transform.flip(self.frames[2], False, True))
-        # right walk images
-        self.frames.append(pg.transform.flip(self.frames[0], True, False))
-        self.frames.append(pg.transform.flip(self.frames[1], True, False))
+        self.load_flipped_frames(setup.GFX[c.ENEMY_SHEET], frame_rect_list)
 
     def get_frame_rect(self, color):
         if color == c.COLOR_TYPE_GREEN:
@@ -359,11 +552,7 @@ class FlyKoopa(Enemy):
             range_end,
             isVertical,
         )
-        # dead jump image
-        self.frames.append(pg.transform.flip(self.frames[2], False, True))
-        # right walk images
-        self.frames.append(pg.transform.flip(self.frames[0], True, False))
-        self.frames.append(pg.transform.flip(self.frames[1], True, False))
+        self.load_flipped_frames(setup.GFX[c.ENEMY_SHEET], frame_rect_list)
         self.state = c.FLY
 
     def get_frame_rect(self, color):
@@ -417,21 +606,19 @@ class FireKoopa(Enemy):
             range_end,
         )
         # right walk images
-        self.frames.append(pg.transform.flip(self.frames[0], True, False))
-        self.frames.append(pg.transform.flip(self.frames[1], True, False))
-        self.frames.append(pg.transform.flip(self.frames[2], True, False))
-        self.frames.append(pg.transform.flip(self.frames[3], True, False))
+        sheet = setup.GFX[c.ENEMY_SHEET]
+        for frame_rect in frame_rect_list:
+            self.frames.append(self.get_frame(sheet, frame_rect, (True, False)))
         self.x_vel = 0
         self.gravity = 0.3
         self.level = level
         self.fire_timer = 0
         self.jump_timer = 0
 
-    def load_frames(self, sheet, frame_rect_list):
-        for frame_rect in frame_rect_list:
-            self.frames.append(
-                tools.get_image(sheet, *frame_rect, c.BLACK, c.BRICK_SIZE_MULTIPLIER)
-            )
+    def get_frame(self, sheet, frame_rect, flip=(False, False)):
+        return tools.get_image(
+            sheet, *frame_rect, c.BLACK, c.BRICK_SIZE_MULTIPLIER, flip
+        )
 
     def walking(self):
         if (self.current_time - self.animate_timer) > 250:
@@ -486,16 +673,14 @@ class Fire(Enemy):
             range_end,
         )
         # right images
-        self.frames.append(pg.transform.flip(self.frames[0], True, False))
-        self.frames.append(pg.transform.flip(self.frames[1], True, False))
+        sheet = setup.GFX[c.ENEMY_SHEET]
+        for frame_rect in frame_rect_list:
+            self.frames.append(self.get_frame(sheet, frame_rect, (True, False)))
         self.state = c.FLY
         self.x_vel = 5 if self.direction == c.RIGHT else -5
 
     def check_x_collisions(self, level):
-        sprite_group = pg.sprite.Group(
-            level.ground_step_pipe_group, level.brick_group, level.box_group
-        )
-        sprite = pg.sprite.spritecollideany(self, sprite_group)
+        sprite = level.solids.collideany(self)
         if sprite:
             self.kill()
 
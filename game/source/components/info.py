@@ -5,10 +5,14 @@ from .. import setup, tools
 from .. import constants as c
 from . import coin
 
+# background color of the text images
+HUD_COLORKEY = (92, 148, 252)
+
+
+class Character:
+    __slots__ = ("image", "rect")
 
-class Character(pg.sprite.Sprite):
     def __init__(self, image):
-        pg.sprite.Sprite.__init__(self)
         self.image = image
         self.rect = self.image.get_rect()
 
@@ -24,6 +28,9 @@ class Info:
         self.create_info_labels()
         self.create_state_labels()
         self.flashing_coin = coin.FlashCoin(280, 53)
+        # labels are baked into hud_image, which is rendered again on changes
+        self.hud_image = None
+        self.text_values = None
 
     def create_font_image_dict(self):
         self.image_dict = {}
@@ -77,7 +84,7 @@ class Info:
 
         for character, image_rect in zip(character_string, image_rect_list):
             self.image_dict[character] = tools.get_image(
-                setup.GFX["text_images"], *image_rect, (92, 148, 252), 2.9
+                setup.GFX["text_images"], *image_rect, HUD_COLORKEY, 2.9
             )
 
     def create_info_labels(self):
@@ -119,7 +126,7 @@ class Info:
 
     def create_player_image(self):
         self.life_times_image = tools.get_image(
-            setup.GFX["text_images"], 75, 247, 6, 6, (92, 148, 252), 2.9
+            setup.GFX["text_images"], 75, 247, 6, 6, HUD_COLORKEY, 2.9
         )
         self.life_times_rect = self.life_times_image.get_rect(center=(378, 295))
         self.life_total_label = []
@@ -130,7 +137,7 @@ class Info:
         else:
             rect = (178, 128, 12, 16)
         self.player_image = tools.get_image(
-            setup.GFX["mario_bros"], *rect, (92, 148, 252), 2.9
+            setup.GFX["mario_bros"], *rect, HUD_COLORKEY, 2.9
         )
         self.player_rect = self.player_image.get_rect(center=(320, 290))
 
@@ -200,17 +207,22 @@ class Info:
 
     def handle_level_state(self, level_info):
         self.score = level_info[c.SCORE]
-        self.update_text(self.score_text, self.score)
-        self.update_text(self.coin_count_text, level_info[c.COIN_TOTAL])
-        self.update_text(self.stage_label, level_info[c.LEVEL_NUM])
+        text_values = (self.score, level_info[c.COIN_TOTAL], level_info[c.LEVEL_NUM])
+        if text_values != self.text_values:
+            self.text_values = text_values
+            self.update_text(self.score_text, self.score)
+            self.update_text(self.coin_count_text, level_info[c.COIN_TOTAL])
+            self.update_text(self.stage_label, level_info[c.LEVEL_NUM])
+            if self.state == c.LOAD_SCREEN:
+                self.update_text(self.stage_label2, level_info[c.LEVEL_NUM])
+            self.hud_image = None
         self.flashing_coin.update(level_info[c.CURRENT_TIME])
-        if self.state == c.LOAD_SCREEN:
-            self.update_text(self.stage_label2, level_info[c.LEVEL_NUM])
         if self.state == c.LEVEL:
             if (level_info[c.CURRENT_TIME] - self.current_time) > 1000:
                 self.current_time = level_info[c.CURRENT_TIME]
                 self.time -= 1
                 self.update_text(self.clock_time_label, self.time, True)
+                self.hud_image = None
 
     def update_text(self, text, score, reset=False):
         if reset and len(text) > len(str(score)):
@@ -223,13 +235,25 @@ class Info:
             index -= 1
 
     def draw(self, surface):
-        self.draw_info(surface, self.state_labels)
-        if self.state == c.LOAD_SCREEN:
-            surface.blit(self.player_image, self.player_rect)
-            surface.blit(self.life_times_image, self.life_times_rect)
+        if self.hud_image is None:
+            self.render_hud()
+        surface.blit(self.hud_image, self.hud_rect)
         surface.blit(self.flashing_coin.image, self.flashing_coin.rect)
 
-    def draw_info(self, surface, label_list):
-        for label in label_list:
-            for letter in label:
-                surface.blit(letter.image, letter.rect)
+    def render_hud(self):
+        """bake all the labels into one colorkeyed image"""
+        images = [
+            (letter.image, letter.rect)
+            for label in self.state_labels
+            for letter in label
+        ]
+        if self.state == c.LOAD_SCREEN:
+            images.append((self.player_image, self.player_rect))
+            images.append((self.life_times_image, self.life_times_rect))
+
+        self.hud_rect = images[0][1].unionall([rect for _, rect in images[1:]])
+        self.hud_image = pg.Surface(self.hud_rect.size).convert()
+        self.hud_image.fill(HUD_COLORKEY)
+        for image, rect in images:
+            self.hud_image.blit(image, rect.move(-self.hud_rect.x, -self.hud_rect.y))
+        self.hud_image.set_colorkey(HUD_COLORKEY, pg.RLEACCEL)
@@ -8,7 +8,24 @@ from .. import constants as c
 from ..components import powerup
 
 
-class Player(pg.sprite.Sprite):
+class Player(tools.StateMachine, pg.sprite.Sprite):
+    state_methods = {
+        c.STAND: "standing",
+        c.WALK: "walking",
+        c.JUMP: "jumping",
+        c.FALL: "falling",
+        c.DEATH_JUMP: "jumping_to_death",
+        c.FLAGPOLE: "flag_pole_sliding",
+        c.WALK_AUTO: "walking_auto",
+        c.END_OF_LEVEL_FALL: "end_of_level_falling",
+        c.IN_CASTLE: "in_castle",
+        c.SMALL_TO_BIG: "changing_to_big",
+        c.BIG_TO_SMALL: "changing_to_small",
+        c.BIG_TO_FIRE: "changing_to_fire",
+        c.DOWN_TO_PIPE: "going_down_pipe",
+        c.UP_OUT_PIPE: "going_up_pipe",
+    }
+
     def __init__(self, player_name):
         pg.sprite.Sprite.__init__(self)
         self.player_name = player_name
@@ -108,16 +125,20 @@ class Player(pg.sprite.Sprite):
 
         for name, frames in frames_list.items():
             for frame in frames:
-                image = tools.get_image(
-                    sheet,
-                    frame["x"],
-                    frame["y"],
-                    frame["width"],
-                    frame["height"],
-                    c.BLACK,
-                    c.SIZE_MULTIPLIER,
+                # frames are shared through the frame cache, copy them because
+                # the invincible animation changes the alpha of the player image
+                image = tools.copy_image(
+                    tools.get_image(
+                        sheet,
+                        frame["x"],
+                        frame["y"],
+                        frame["width"],
+                        frame["height"],
+                        c.BLACK,
+                        c.SIZE_MULTIPLIER,
+                    )
                 )
-                left_image = pg.transform.flip(image, True, False)
+                left_image = tools.copy_image(image, (True, False))
 
                 if name == c.RIGHT_SMALL_NORMAL:
                     self.right_small_normal_frames.append(image)
@@ -158,39 +179,21 @@ class Player(pg.sprite.Sprite):
         self.check_if_invincible()
         self.animation()
 
-    def handle_state(self, keys, fire_group):
-        if self.state == c.STAND:
-            self.standing(keys, fire_group)
-        elif self.state == c.WALK:
-            self.walking(keys, fire_group)
-        elif self.state == c.JUMP:
-            self.jumping(keys, fire_group)
-        elif self.state == c.FALL:
-            self.falling(keys, fire_group)
-        elif self.state == c.DEATH_JUMP:
-            self.jumping_to_death()
-        elif self.state == c.FLAGPOLE:
-            self.flag_pole_sliding()
-        elif self.state == c.WALK_AUTO:
-            self.walking_auto()
-        elif self.state == c.END_OF_LEVEL_FALL:
-            self.y_vel += self.gravity
-        elif self.state == c.IN_CASTLE:
-            self.frame_index = 0
-        elif self.state == c.SMALL_TO_BIG:
-            self.changing_to_big()
-        elif self.state == c.BIG_TO_SMALL:
-            self.changing_to_small()
-        elif self.state == c.BIG_TO_FIRE:
-            self.changing_to_fire()
-        elif self.state == c.DOWN_TO_PIPE:
-            self.y_vel = 1
-            self.rect.y += self.y_vel
-        elif self.state == c.UP_OUT_PIPE:
-            self.y_vel = -1
-            self.rect.y += self.y_vel
-            if self.rect.bottom < self.up_pipe_y:
-                self.state = c.STAND
+    def end_of_level_falling(self, keys, fire_group):
+        self.y_vel += self.gravity
+
+    def in_castle(self, keys, fire_group):
+        self.frame_index = 0
+
+    def going_down_pipe(self, keys, fire_group):
+        self.y_vel = 1
+        self.rect.y += self.y_vel
+
+    def going_up_pipe(self, keys, fire_group):
+        self.y_vel = -1
+        self.rect.y += self.y_vel
+        if self.rect.bottom < self.up_pipe_y:
+            self.state = c.STAND
 
     def check_to_allow_jump(self, keys):
         if not keys[tools.keybinding["jump"]]:
@@ -349,7 +352,7 @@ class Player(pg.sprite.Sprite):
             if self.fire and self.allow_fireball:
                 self.shoot_fireball(fire_group)
 
-    def jumping_to_death(self):
+    def jumping_to_death(self, keys, fire_group):
         if self.death_timer == 0:
             self.death_timer = self.current_time
         elif (self.current_time - self.death_timer) > 500:
@@ -384,12 +387,14 @@ class Player(pg.sprite.Sprite):
         if (self.current_time - self.last_fireball_time) > 500:
             self.allow_fireball = False
             powerup_group.add(
-                powerup.FireBall(self.rect.right, self.rect.y, self.facing_right)
+                powerup.fireball_pool.acquire(
+                    self.rect.right, self.rect.y, self.facing_right
+                )
             )
             self.last_fireball_time = self.current_time
             self.frame_index = 6
 
-    def flag_pole_sliding(self):
+    def flag_pole_sliding(self, keys, fire_group):
         self.state = c.FLAGPOLE
         self.x_vel = 0
         self.y_vel = 5
@@ -406,7 +411,7 @@ class Player(pg.sprite.Sprite):
         elif self.rect.bottom >= 493:
             self.frame_index = 10
 
-    def walking_auto(self):
+    def walking_auto(self, keys, fire_group):
         self.max_x_vel = 5
         self.x_accel = self.walk_accel
 
@@ -421,7 +426,7 @@ class Player(pg.sprite.Sprite):
                 self.frame_index = 1
             self.walking_timer = self.current_time
 
-    def changing_to_big(self):
+    def changing_to_big(self, keys, fire_group):
         timer_list = [135, 200, 365, 430, 495, 560, 625, 690, 755, 820, 885]
         # size value 0:small, 1:middle, 2:big
         size_list = [1, 0, 1, 0, 1, 2, 0, 1, 2, 0, 2]
@@ -449,7 +454,7 @@ class Player(pg.sprite.Sprite):
                 self.set_player_image(frame, frame_index)
             self.change_index += 1
 
-    def changing_to_small(self):
+    def changing_to_small(self, keys, fire_group):
         timer_list = [265, 330, 395, 460, 525, 590, 655, 720, 785, 850, 915]
         # size value 0:big, 1:middle, 2:small
         size_list = [0, 1, 2, 1, 2, 1, 2, 1, 2, 1, 2]
@@ -480,7 +485,7 @@ class Player(pg.sprite.Sprite):
                 self.set_player_image(frame, frame_index)
             self.change_index += 1
 
-    def changing_to_fire(self):
+    def changing_to_fire(self, keys, fire_group):
         timer_list = [
             65,
             195,
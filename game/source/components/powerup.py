@@ -1,6 +1,5 @@
 __author__ = "marble_xu"
 
-import pygame as pg
 from .. import setup, tools
 from .. import constants as c
 from . import stuff
@@ -32,10 +31,7 @@ class Powerup(stuff.Stuff):
             self.kill()
 
     def check_x_collisions(self, level):
-        sprite_group = pg.sprite.Group(
-            level.ground_step_pipe_group, level.brick_group, level.box_group
-        )
-        sprite = pg.sprite.spritecollideany(self, sprite_group)
+        sprite = level.solids.collideany(self)
         if sprite:
             if self.direction == c.RIGHT:
                 self.rect.right = sprite.rect.left - 1
@@ -48,11 +44,7 @@ class Powerup(stuff.Stuff):
                 self.x_vel = 0
 
     def check_y_collisions(self, level):
-        sprite_group = pg.sprite.Group(
-            level.ground_step_pipe_group, level.brick_group, level.box_group
-        )
-
-        sprite = pg.sprite.spritecollideany(self, sprite_group)
+        sprite = level.solids.collideany(self)
         if sprite:
             self.y_vel = 0
             self.rect.bottom = sprite.rect.top
@@ -169,11 +161,7 @@ class Star(Powerup):
         self.animation()
 
     def check_y_collisions(self, level):
-        sprite_group = pg.sprite.Group(
-            level.ground_step_pipe_group, level.brick_group, level.box_group
-        )
-
-        sprite = pg.sprite.spritecollideany(self, sprite_group)
+        sprite = level.solids.collideany(self)
 
         if sprite:
             if self.rect.top > sprite.rect.top:
@@ -183,8 +171,8 @@ class Star(Powerup):
                 self.y_vel = -5
 
 
-class FireBall(Powerup):
-    def __init__(self, x, y, facing_right):
+class FireBall(tools.Pooled, Powerup):
+    def __init__(self, x=0, y=0, facing_right=True):
         # first 3 Frames are flying, last 4 frams are exploding
         frame_rect_list = [
             (96, 144, 8, 8),
@@ -199,9 +187,17 @@ class FireBall(Powerup):
             self, x, y, setup.GFX[c.ITEM_SHEET], frame_rect_list, c.SIZE_MULTIPLIER
         )
         self.type = c.TYPE_FIREBALL
-        self.y_vel = 10
         self.gravity = 0.9
+        self.reset(x, y, facing_right)
+
+    def reset(self, x, y, facing_right):
+        self.frame_index = 0
+        self.image = self.frames[self.frame_index]
+        self.animate_timer = 0
+        self.box_height = y
+        self.y_vel = 10
         self.state = c.FLYING
+        self.rect.y = y
         self.rect.right = x
         if facing_right:
             self.direction = c.RIGHT
@@ -233,20 +229,13 @@ class FireBall(Powerup):
         self.animation()
 
     def check_x_collisions(self, level):
-        sprite_group = pg.sprite.Group(
-            level.ground_step_pipe_group, level.brick_group, level.box_group
-        )
-        sprite = pg.sprite.spritecollideany(self, sprite_group)
+        sprite = level.solids.collideany(self)
         if sprite:
             self.change_to_explode()
 
     def check_y_collisions(self, level):
-        sprite_group = pg.sprite.Group(
-            level.ground_step_pipe_group, level.brick_group, level.box_group
-        )
-
-        sprite = pg.sprite.spritecollideany(self, sprite_group)
-        enemy = pg.sprite.spritecollideany(self, level.enemy_group)
+        sprite = level.solids.collideany(self)
+        enemy = level.enemy_index.collideany(self)
         if sprite:
             if self.rect.top > sprite.rect.top:
                 self.change_to_explode()
@@ -268,3 +257,6 @@ class FireBall(Powerup):
     def change_to_explode(self):
         self.frame_index = 4
         self.state = c.EXPLODING
+
+
+fireball_pool = tools.SpritePool(FireBall)
@@ -5,19 +5,23 @@ from .. import setup, tools
 from .. import constants as c
 
 
-class Collider(pg.sprite.Sprite):
+class Collider(tools.Record):
+    """invisible ground and step geometry"""
+
+    __slots__ = ("rect", "name")
+    debug_color = c.RED
+
     def __init__(self, x, y, width, height, name):
-        pg.sprite.Sprite.__init__(self)
-        self.image = pg.Surface((width, height)).convert()
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = y
+        self.rect = pg.Rect(x, y, width, height)
         self.name = name
-        if c.DEBUG:
-            self.image.fill(c.RED)
 
 
-class Checkpoint(pg.sprite.Sprite):
+class Checkpoint(tools.Record):
+    """invisible trigger area, taken out of the checkpoint group once the
+    player touches it"""
+
+    __slots__ = ("rect", "type", "enemy_groupid", "map_index", "name")
+
     def __init__(
         self,
         x,
@@ -29,11 +33,7 @@ class Checkpoint(pg.sprite.Sprite):
         map_index=0,
         name=c.MAP_CHECKPOINT,
     ):
-        pg.sprite.Sprite.__init__(self)
-        self.image = pg.Surface((width, height))
-        self.rect = self.image.get_rect()
-        self.rect.x = x
-        self.rect.y = y
+        self.rect = pg.Rect(x, y, width, height)
         self.type = type
         self.enemy_groupid = enemy_groupid
         self.map_index = map_index
@@ -109,25 +109,37 @@ class CastleFlag(Stuff):
             self.rect.y += self.y_vel
 
 
-class Digit(pg.sprite.Sprite):
+class Digit:
+    __slots__ = ("image", "rect")
+
     def __init__(self, image):
-        pg.sprite.Sprite.__init__(self)
         self.image = image
         self.rect = self.image.get_rect()
 
 
 class Score:
-    def __init__(self, x, y, score):
+    __slots__ = ("digits", "digit_list", "x", "y", "y_vel", "score", "distance")
+    # digit images shared by all the score popups
+    image_dict = None
+
+    def __init__(self, x=0, y=0, score=0):
+        self.digits = []
+        self.create_images_dict()
+        self.reset(x, y, score)
+
+    def reset(self, x, y, score):
         self.x = x
         self.y = y
         self.y_vel = -3
-        self.create_images_dict()
         self.score = score
         self.create_score_digit()
         self.distance = 130 if self.score == 1000 else 75
 
-    def create_images_dict(self):
-        self.image_dict = {}
+    @classmethod
+    def create_images_dict(cls):
+        if cls.image_dict is not None:
+            return
+        cls.image_dict = {}
         digit_rect_list = [
             (1, 168, 3, 8),
             (5, 168, 3, 8),
@@ -142,31 +154,73 @@ class Score:
         ]
         digit_string = "0123456789"
         for digit, image_rect in zip(digit_string, digit_rect_list):
-            self.image_dict[digit] = tools.get_image(
+            cls.image_dict[digit] = tools.get_image(
                 setup.GFX[c.ITEM_SHEET], *image_rect, c.BLACK, c.BRICK_SIZE_MULTIPLIER
             )
 
     def create_score_digit(self):
-        self.digit_group = pg.sprite.Group()
-        self.digit_list = []
-        for digit in str(self.score):
-            self.digit_list.append(Digit(self.image_dict[digit]))
-
-        for i, digit in enumerate(self.digit_list):
-            digit.rect = digit.image.get_rect()
+        """reuse the Digit sprites of the previous score"""
+        score_string = str(self.score)
+        while len(self.digits) < len(score_string):
+            self.digits.append(Digit(self.image_dict["0"]))
+        self.digit_list = self.digits[: len(score_string)]
+
+        for i, (digit, number) in enumerate(zip(self.digit_list, score_string)):
+            digit.image = self.image_dict[number]
+            digit.rect.size = digit.image.get_size()
             digit.rect.x = self.x + (i * 10)
             digit.rect.y = self.y
 
-    def update(self, score_list):
+    def update(self):
         for digit in self.digit_list:
             digit.rect.y += self.y_vel
 
-        if (self.y - self.digit_list[0].rect.y) > self.distance:
-            score_list.remove(self)
+    def is_finished(self):
+        return (self.y - self.digit_list[0].rect.y) > self.distance
 
-    def draw(self, screen):
+    def draw(self, screen, offset=(0, 0)):
         for digit in self.digit_list:
-            screen.blit(digit.image, digit.rect)
+            screen.blit(digit.image, digit.rect.move(offset))
+
+
+class ScorePool:
+    """fixed number of Score popups which are reused, the oldest popup is
+    recycled when all of them are moving"""
+
+    def __init__(self, size=c.SCORE_POOL_SIZE):
+        self.free = [Score() for _ in range(size)]
+        self.active = []
+
+    def __iter__(self):
+        return iter(self.active)
+
+    def __len__(self):
+        return len(self.active)
+
+    def add(self, x, y, score):
+        if self.free:
+            popup = self.free.pop()
+        else:
+            popup = self.active.pop(0)
+        popup.reset(x, y, score)
+        self.active.append(popup)
+
+    def clear(self):
+        self.free.extend(self.active)
+        self.active = []
+
+    def update(self):
+        finished = False
+        for popup in self.active:
+            popup.update()
+            finished = finished or popup.is_finished()
+        if finished:
+            self.free.extend(popup for popup in self.active if popup.is_finished())
+            self.active = [popup for popup in self.active if not popup.is_finished()]
+
+    def draw(self, surface, offset=(0, 0)):
+        for popup in self.active:
+            popup.draw(surface, offset)
 
 
 class Pipe(Stuff):
@@ -199,6 +253,7 @@ class Pipe(Stuff):
             y = top_height + i * bottom_height
             self.image.blit(img, (0, y), (0, top_height, width, bottom_height))
         self.image.set_colorkey(c.BLACK)
+        tools.set_native_image(self.image, c.BRICK_SIZE_MULTIPLIER)
 
     def check_ignore_collision(self, level):
         if self.type == c.PIPE_TYPE_HORIZONTAL:
@@ -212,7 +267,9 @@ class Slider(Stuff):
     def __init__(
         self, x, y, num, direction, range_start, range_end, vel, name=c.MAP_SLIDER
     ):
-        Stuff.__init__(self, x, y, setup.GFX[c.ITEM_SHEET], [(64, 128, 15, 8)], 2.8)
+        Stuff.__init__(
+            self, x, y, setup.GFX[c.ITEM_SHEET], [(64, 128, 15, 8)], c.SLIDER_MULTIPLIER
+        )
         self.name = name
         self.create_image(x, y, num)
         self.range_start = range_start
@@ -239,6 +296,7 @@ class Slider(Stuff):
             x = i * width
             self.image.blit(img, (x, 0))
         self.image.set_colorkey(c.BLACK)
+        tools.set_native_image(self.image, c.SLIDER_MULTIPLIER)
 
     def update(self):
         if self.direction == c.VERTICAL:
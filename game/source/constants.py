@@ -10,6 +10,11 @@ SCREEN_SIZE = (SCREEN_WIDTH, SCREEN_HEIGHT)
 
 ORIGINAL_CAPTION = "Super Mario Bros"
 
+# DISPLAY MODES
+DISPLAY_WINDOW = "window"
+DISPLAY_DUMMY = "dummy"
+DISPLAY_OFFSCREEN = "offscreen"
+
 ## COLORS ##
 #                R    G    B
 GRAY = (100, 100, 100)
@@ -32,13 +37,59 @@ GOLD = (255, 215, 0)
 BGCOLOR = WHITE
 
 
+# compose the level at the resolution of the sprite sheets and scale the
+# frame to the screen once, the game logic still uses the scaled coordinates
+NATIVE_RENDER = False
+
 SIZE_MULTIPLIER = 2.5
 BRICK_SIZE_MULTIPLIER = 2.69
 BACKGROUND_MULTIPLER = 2.679
+SLIDER_MULTIPLIER = 2.8
 GROUND_HEIGHT = SCREEN_HEIGHT - 62
 
+# the level background is scaled in tiles, at most BACKGROUND_MAX_TILES are kept
+BACKGROUND_TILE_WIDTH = SCREEN_WIDTH
+BACKGROUND_MAX_TILES = 4
+BACKGROUND_PREFETCH = 200
+
+# in dirty rect mode, the whole screen is updated if the changed regions
+# cover more than this part of it
+DIRTY_FULL_UPDATE = 0.5
+
+# cell size of the collision grid, the size of a brick. static sprites are
+# also put in the cells above and below them, which covers the bump of bricks
+# and boxes
+COLLISION_CELL_SIZE = 43
+
+# move the walking and falling enemies in one numpy pass when there are at
+# least ENEMY_BATCH_SIZE of them, ignored if numpy isn't installed. off by
+# default, the enemies awake in the levels are too few for it to pay off
+ENEMY_BATCH_PHYSICS = False
+ENEMY_BATCH_SIZE = 16
+
+# enemies, shells and powerups further than this from the viewport sleep,
+# they don't move or animate until the viewport comes close again. None
+# keeps them all awake
+ACTIVITY_MARGIN = SCREEN_WIDTH * 2
+
+# add up the time the player and the enemies spend in each state, see
+# tools.STATE_TIMES
+PROFILE_STATES = False
+
+# upper bound of the memory used by the cached sprite frames
+FRAME_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
 GAME_TIME_OUT = 301
 
+# number of score popups which can move at the same time
+SCORE_POOL_SIZE = 16
+
+# sprites made ahead by the pools of the short lived sprites when a level
+# starts, the pools make more if they run out
+FIREBALL_POOL_SIZE = 4
+BRICK_PIECE_POOL_SIZE = 8
+COIN_POOL_SIZE = 4
+
 # STATES FOR ENTIRE GAME
 MAIN_MENU = "main menu"
 LOAD_SCREEN = "load screen"
@@ -116,14 +167,16 @@ COLOR_TYPE_ORANGE = 0
 COLOR_TYPE_GREEN = 1
 COLOR_TYPE_RED = 2
 
+# SPRITE STATES, every state has its own integer id
+
 # BRICK STATES
-RESTING = "resting"
-BUMPED = "bumped"
-OPENED = "opened"
+RESTING = 0
+BUMPED = 1
+OPENED = 2
 
 # MUSHROOM STATES
-REVEAL = "reveal"
-SLIDE = "slide"
+REVEAL = 3
+SLIDE = 4
 
 # Player FRAMES
 PLAYER_FRAMES = "image_frames"
@@ -132,20 +185,20 @@ RIGHT_BIG_NORMAL = "right_big_normal"
 RIGHT_BIG_FIRE = "right_big_fire"
 
 # PLAYER States
-STAND = "standing"
-WALK = "walk"
-JUMP = "jump"
-FALL = "fall"
-FLY = "fly"
-SMALL_TO_BIG = "small to big"
-BIG_TO_FIRE = "big to fire"
-BIG_TO_SMALL = "big to small"
-FLAGPOLE = "flag pole"
-WALK_AUTO = "walk auto"  # not handle key input in this state
-END_OF_LEVEL_FALL = "end of level fall"
-IN_CASTLE = "in castle"
-DOWN_TO_PIPE = "down to pipe"
-UP_OUT_PIPE = "up out of pipe"
+STAND = 5
+WALK = 6
+JUMP = 7
+FALL = 8
+FLY = 9
+SMALL_TO_BIG = 10
+BIG_TO_FIRE = 11
+BIG_TO_SMALL = 12
+FLAGPOLE = 13
+WALK_AUTO = 14  # not handle key input in this state
+END_OF_LEVEL_FALL = 15
+IN_CASTLE = 16
+DOWN_TO_PIPE = 17
+UP_OUT_PIPE = 18
 
 # PLAYER FORCES
 PLAYER_SPEED = "speed"
@@ -171,21 +224,53 @@ FIRESTICK = "firestick"
 # GOOMBA Stuff
 LEFT = "left"
 RIGHT = "right"
-JUMPED_ON = "jumped on"
-DEATH_JUMP = "death jump"
+JUMPED_ON = 19
+DEATH_JUMP = 20
 
 # KOOPA STUFF
-SHELL_SLIDE = "shell slide"
+SHELL_SLIDE = 21
 
 # FLAG STATE
-TOP_OF_POLE = "top of pole"
-SLIDE_DOWN = "slide down"
-BOTTOM_OF_POLE = "bottom of pole"
+TOP_OF_POLE = 22
+SLIDE_DOWN = 23
+BOTTOM_OF_POLE = 24
 
 # FIREBALL STATE
-FLYING = "flying"
-BOUNCING = "bouncing"
-EXPLODING = "exploding"
+FLYING = 25
+BOUNCING = 26
+EXPLODING = 27
+
+# names of the integer state ids above, for debugging and profiling
+STATE_NAMES = {
+    RESTING: "resting",
+    BUMPED: "bumped",
+    OPENED: "opened",
+    REVEAL: "reveal",
+    SLIDE: "slide",
+    STAND: "standing",
+    WALK: "walk",
+    JUMP: "jump",
+    FALL: "fall",
+    FLY: "fly",
+    SMALL_TO_BIG: "small to big",
+    BIG_TO_FIRE: "big to fire",
+    BIG_TO_SMALL: "big to small",
+    FLAGPOLE: "flag pole",
+    WALK_AUTO: "walk auto",
+    END_OF_LEVEL_FALL: "end of level fall",
+    IN_CASTLE: "in castle",
+    DOWN_TO_PIPE: "down to pipe",
+    UP_OUT_PIPE: "up out of pipe",
+    JUMPED_ON: "jumped on",
+    DEATH_JUMP: "death jump",
+    SHELL_SLIDE: "shell slide",
+    TOP_OF_POLE: "top of pole",
+    SLIDE_DOWN: "slide down",
+    BOTTOM_OF_POLE: "bottom of pole",
+    FLYING: "flying",
+    BOUNCING: "bouncing",
+    EXPLODING: "exploding",
+}
 
 # IMAGE SHEET
 ENEMY_SHEET = "smb_enemies_sheet"
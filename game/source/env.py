@@ -0,0 +1,160 @@
+__author__ = "marble_xu"
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError("VecEnv needs numpy, install it with pip install numpy") from e
+import pygame as pg
+from . import setup, tools
+from . import constants as c
+from .states import level
+
+# columns of the key state array passed to VecEnv.step
+KEY_NAMES = ("action", "jump", "left", "right", "down")
+KEY_INDEX = {tools.keybinding[name]: i for i, name in enumerate(KEY_NAMES)}
+
+# columns of the observations returned by VecEnv
+OBSERVATION_NAMES = (
+    "x",
+    "y",
+    "x_vel",
+    "y_vel",
+    "state",
+    "big",
+    "fire",
+    "viewport_x",
+    "score",
+    "coins",
+    "time",
+)
+
+# columns of the rewards returned by VecEnv.step
+REWARD_NAMES = ("score", "x")
+
+
+def new_game_info(level_num):
+    """game info of a new game started at level_num"""
+    return {
+        c.COIN_TOTAL: 0,
+        c.SCORE: 0,
+        c.LIVES: 3,
+        c.TOP_SCORE: 0,
+        c.CURRENT_TIME: 0.0,
+        c.LEVEL_NUM: level_num,
+        c.PLAYER_NAME: c.PLAYER_MARIO,
+    }
+
+
+def observe(game):
+    """the OBSERVATION_NAMES values of a running Level"""
+    player = game.player
+    return (
+        player.rect.x,
+        player.rect.y,
+        player.x_vel,
+        player.y_vel,
+        player.state,
+        player.big,
+        player.fire,
+        game.viewport.x,
+        game.game_info[c.SCORE],
+        game.game_info[c.COIN_TOTAL],
+        game.overhead_info.time,
+    )
+
+
+class ArrayKeys:
+    """pressed keys of one environment, looked up in a row of the key
+    state array like the result of pg.key.get_pressed"""
+
+    def __init__(self, row):
+        self.row = row
+
+    def __getitem__(self, key):
+        index = KEY_INDEX.get(key)
+        return index is not None and bool(self.row[index])
+
+
+class VecEnv:
+    """runs num_envs independent levels in lockstep in one process
+
+    every environment has its own Level, game info and FixedStepClock, the
+    images are shared through setup.GFX and tools.FRAME_CACHE. an episode
+    ends when the player dies or the level is done, and the environment is
+    started again at the next step. with pixels the levels are drawn to
+    their own surfaces and step also returns the frames.
+    """
+
+    def __init__(self, num_envs, level_num=1, pixels=False, max_frames=None):
+        if setup.SCREEN is None:
+            setup.init(c.DISPLAY_OFFSCREEN)
+        self.num_envs = num_envs
+        self.level_nums = np.broadcast_to(np.asarray(level_num), (num_envs,))
+        self.pixels = pixels
+        self.max_frames = max_frames
+        self.levels = [None] * num_envs
+        self.clocks = [None] * num_envs
+        self.surfaces = [None] * num_envs
+        self.frames = np.zeros(num_envs, np.int64)
+        self.last_score = np.zeros(num_envs, np.int64)
+        self.last_x = np.zeros(num_envs, np.int64)
+        self.needs_reset = np.zeros(num_envs, bool)
+
+    def reset(self):
+        for i in range(self.num_envs):
+            self.reset_env(i)
+        return self.observe()
+
+    def reset_env(self, i):
+        self.clocks[i] = tools.FixedStepClock()
+        self.levels[i] = level.Level()
+        self.levels[i].startup(
+            self.clocks[i].tick(), new_game_info(int(self.level_nums[i]))
+        )
+        self.frames[i] = 0
+        self.last_score[i] = 0
+        self.last_x[i] = self.levels[i].player.rect.x
+        self.needs_reset[i] = False
+
+    def step(self, keys):
+        """keys is a (num_envs, len(KEY_NAMES)) array of the pressed keys,
+        return (observations, rewards, dones) or (observations, rewards,
+        dones, frames) with pixels"""
+        keys = np.asarray(keys)
+        dones = np.zeros(self.num_envs, bool)
+        for i, game in enumerate(self.levels):
+            if game is None or self.needs_reset[i]:
+                self.reset_env(i)
+                game = self.levels[i]
+            game.update(self.surfaces[i], ArrayKeys(keys[i]), self.clocks[i].tick())
+            self.frames[i] += 1
+            dones[i] = game.done or game.player.dead
+            if self.max_frames is not None and self.frames[i] >= self.max_frames:
+                dones[i] = True
+        self.needs_reset |= dones
+
+        observations = self.observe()
+        score = observations[:, OBSERVATION_NAMES.index("score")].astype(np.int64)
+        x = observations[:, OBSERVATION_NAMES.index("x")].astype(np.int64)
+        rewards = np.stack([score - self.last_score, x - self.last_x], axis=1)
+        self.last_score, self.last_x = score, x
+        if self.pixels:
+            return observations, rewards.astype(np.float32), dones, self.render()
+        return observations, rewards.astype(np.float32), dones
+
+    def observe(self):
+        observations = np.zeros((self.num_envs, len(OBSERVATION_NAMES)), np.float32)
+        for i, game in enumerate(self.levels):
+            if game is not None:
+                observations[i] = observe(game)
+        return observations
+
+    def render(self):
+        """draw every level and return the (num_envs, height, width, 3) frames"""
+        frames = np.zeros((self.num_envs, c.SCREEN_HEIGHT, c.SCREEN_WIDTH, 3), np.uint8)
+        for i, game in enumerate(self.levels):
+            if self.surfaces[i] is None:
+                self.surfaces[i] = pg.Surface(c.SCREEN_SIZE).convert()
+            game.draw(self.surfaces[i])
+            frames[i] = pg.surfarray.pixels3d(self.surfaces[i]).transpose(1, 0, 2)
+        return frames
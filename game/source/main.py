@@ -1,13 +1,58 @@
 __author__ = "marble_xu"
 
+import argparse
 import pygame as pg
 from . import setup, tools
 from . import constants as c
 from .states import main_menu, load_screen, level
 
 
-def main():
-    game = tools.Control()
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="super mario")
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="run without a window as fast as possible, on a fixed step clock",
+    )
+    parser.add_argument(
+        "--render-every",
+        type=int,
+        default=1,
+        metavar="N",
+        help="show only every N-th frame, which fast forwards the game",
+    )
+    parser.add_argument(
+        "--draw-every",
+        type=int,
+        default=1,
+        metavar="N",
+        help="draw the state only every N-th frame, 0 to never draw it",
+    )
+    parser.add_argument(
+        "--frames",
+        type=int,
+        default=None,
+        metavar="N",
+        help="stop after N frames",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.headless:
+        game = tools.Control(
+            setup.init(c.DISPLAY_OFFSCREEN),
+            headless=True,
+            game_clock=tools.FixedStepClock(),
+            draw_every=args.draw_every,
+        )
+    else:
+        game = tools.Control(
+            setup.init(),
+            render_every=args.render_every,
+            draw_every=args.draw_every,
+        )
     state_dict = {
         c.MAIN_MENU: main_menu.Menu(),
         c.LOAD_SCREEN: load_screen.LoadScreen(),
@@ -16,4 +61,4 @@ def main():
         c.TIME_OUT: load_screen.TimeOut(),
     }
     game.setup_states(state_dict, c.MAIN_MENU)
-    game.main()
+    game.main(args.frames)
@@ -0,0 +1,253 @@
+__author__ = "marble_xu"
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import numpy as np
+except ImportError as e:
+    raise ImportError(
+        "RolloutRunner needs numpy, install it with pip install numpy"
+    ) from e
+from . import setup, tools, env
+from . import constants as c
+from .states import main_menu, load_screen, level
+
+# a rollout which didn't end by itself is stopped after this many frames
+ROLLOUT_MAX_FRAMES = 60 * 60 * 5
+
+# outcomes of a rollout
+FINISHED = "finished"  # the level is done
+DIED = "died"
+STOPPED = "stopped"  # the inputs or max_frames ran out
+ERROR = "error"  # the rollout raised, the exception is put in death_cause
+CRASHED = "crashed"  # the worker process died, even when run on its own
+
+# causes of death
+FELL = "fell"
+TIME_UP = "time up"
+HIT = "hit"
+
+RESULT_COLUMNS = (
+    ("level", np.int32),
+    ("score", np.int64),
+    ("coins", np.int32),
+    ("lives", np.int32),
+    ("x", np.int32),
+    ("frames", np.int32),
+    ("outcome", object),
+    ("death_cause", object),
+)
+
+# the warm Control of a worker process and its states, made by init_worker
+control = None
+states = None
+
+
+def init_worker():
+    """load the game once in a worker process"""
+    global control, states
+    screen = setup.init(c.DISPLAY_OFFSCREEN)
+    control = tools.Control(screen, headless=True, draw_every=0)
+    states = {
+        c.MAIN_MENU: main_menu.Menu(),
+        c.LOAD_SCREEN: load_screen.LoadScreen(),
+        c.LEVEL: level.Level(),
+        c.GAME_OVER: load_screen.GameOver(),
+        c.TIME_OUT: load_screen.TimeOut(),
+    }
+
+
+def play(level_num, inputs, max_frames):
+    """play one rollout on the worker Control and return its result row
+
+    inputs is either a (frames, len(env.KEY_NAMES)) array of key states, or
+    an agent called with the env.observe values of every frame which
+    returns the key state row of that frame"""
+    control.game_clock = tools.FixedStepClock()
+    control.setup_states(states, c.LEVEL)
+    game = control.state
+    # the level of the last rollout may be done, and a new game needs a new
+    # player, Player.restart keeps the speed and powerups
+    game.cleanup()
+    game.player = None
+    game_info = env.new_game_info(level_num)
+    game.startup(control.game_clock.tick(), game_info)
+
+    if callable(inputs):
+        frames = max_frames
+    else:
+        frames = min(len(inputs), max_frames)
+    outcome, death_cause = STOPPED, ""
+    x = game.player.rect.x
+    frame = 0
+    while frame < frames:
+        if callable(inputs):
+            keys = inputs(env.observe(game))
+        else:
+            keys = inputs[frame]
+        control.keys = env.ArrayKeys(keys)
+        control.update()
+        frame += 1
+        x = max(x, game.player.rect.x)
+        if game.player.dead:
+            outcome = DIED
+            if game.player.rect.y > c.SCREEN_HEIGHT:
+                death_cause = FELL
+            elif game.overhead_info.time <= 0:
+                death_cause = TIME_UP
+            else:
+                death_cause = HIT
+            break
+        if game.done:
+            outcome = FINISHED
+            break
+
+    return (
+        level_num,
+        game_info[c.SCORE],
+        game_info[c.COIN_TOTAL],
+        game_info[c.LIVES] - (outcome == DIED),
+        x,
+        frame,
+        outcome,
+        death_cause,
+    )
+
+
+def run_chunk(chunk, max_frames):
+    """play the (index, level_num, inputs) rollouts of a chunk"""
+    results = []
+    for index, level_num, inputs in chunk:
+        try:
+            row = play(level_num, inputs, max_frames)
+        except Exception as e:
+            row = (level_num, 0, 0, 0, 0, 0, ERROR, repr(e))
+        results.append((index, row))
+    return results
+
+
+class RolloutRunner:
+    """plays rollouts in a pool of worker processes, each of them keeps a
+    headless Control with the images already loaded
+
+    the rollouts are sent to the workers in chunks of chunk_size. when a
+    worker dies, all the rollouts which were not done become suspects. they
+    are split between single worker pools running side by side, where they
+    are played one by one, so a crash only stops the suspects of its pool and
+    points at the rollout which caused it. the suspects which weren't played
+    go back to the pool. a rollout which kills its worker more than retries
+    times is recorded as CRASHED.
+    """
+
+    def __init__(
+        self,
+        workers=None,
+        chunk_size=16,
+        max_frames=ROLLOUT_MAX_FRAMES,
+        retries=1,
+        mp_context=None,
+    ):
+        self.workers = workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.max_frames = max_frames
+        self.retries = retries
+        self.mp_context = mp_context
+
+    def make_pool(self, workers):
+        return ProcessPoolExecutor(
+            workers, mp_context=self.mp_context, initializer=init_worker
+        )
+
+    def run(self, rollouts, progress=None):
+        """play the (level_num, inputs) rollouts and return the results as
+        a dict of column name to array, in the order of rollouts. progress
+        is called with (rollouts done, total) whenever rollouts are done"""
+        items = [
+            (i, level_num, inputs) for i, (level_num, inputs) in enumerate(rollouts)
+        ]
+        self.rows = [None] * len(items)
+        self.done = 0
+        self.progress = progress
+        self.crashes = {}
+
+        pending = [
+            items[i : i + self.chunk_size]
+            for i in range(0, len(items), self.chunk_size)
+        ]
+        suspects = []
+        while pending or suspects:
+            if pending:
+                suspects.extend(self.run_pool(pending))
+                pending = []
+            else:
+                pending, suspects = self.run_suspects(suspects)
+
+        return {
+            name: np.array([row[i] for row in self.rows], dtype)
+            for i, (name, dtype) in enumerate(RESULT_COLUMNS)
+        }
+
+    def record(self, results):
+        for index, row in results:
+            self.rows[index] = row
+        self.done += len(results)
+        if self.progress is not None:
+            self.progress(self.done, len(self.rows))
+
+    def run_pool(self, chunks):
+        """play the chunks in the pool, return the rollouts of the chunks
+        which were lost with a worker"""
+        lost = []
+        with self.make_pool(self.workers) as pool:
+            futures = {
+                pool.submit(run_chunk, chunk, self.max_frames): chunk
+                for chunk in chunks
+            }
+            for future in as_completed(futures):
+                try:
+                    self.record(future.result())
+                except BrokenProcessPool:
+                    lost.extend(futures[future])
+        return lost
+
+    def run_suspects(self, suspects):
+        """play the suspects one by one in single worker pools, return
+        (chunks for the pool, suspects to retry)"""
+        count = min(self.workers, len(suspects))
+        groups = [suspects[i::count] for i in range(count)]
+        pools = [self.make_pool(1) for group in groups]
+        crashed = []
+        rest = []
+        try:
+            futures = [
+                [pool.submit(run_chunk, [item], self.max_frames) for item in group]
+                for pool, group in zip(pools, groups)
+            ]
+            for group, group_futures in zip(groups, futures):
+                # a single worker plays its suspects in order, the first one
+                # lost with it is the one which killed it
+                for i, future in enumerate(group_futures):
+                    try:
+                        self.record(future.result())
+                    except BrokenProcessPool:
+                        crashed.append(group[i])
+                        rest.extend(group[i + 1 :])
+                        break
+        finally:
+            for pool in pools:
+                pool.shutdown()
+
+        retry = []
+        for item in crashed:
+            index, level_num, _ = item
+            self.crashes[index] = self.crashes.get(index, 0) + 1
+            if self.crashes[index] > self.retries:
+                self.record([(index, (level_num, 0, 0, 0, 0, 0, CRASHED, ""))])
+            else:
+                retry.append(item)
+        chunks = [
+            rest[j : j + self.chunk_size] for j in range(0, len(rest), self.chunk_size)
+        ]
+        return chunks, retry
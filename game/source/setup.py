@@ -5,12 +5,34 @@ import pygame as pg
 from . import constants as c
 from . import tools
 
-pg.init()
-pg.event.set_allowed([pg.KEYDOWN, pg.KEYUP, pg.QUIT])
-pg.display.set_caption(c.ORIGINAL_CAPTION)
-SCREEN = pg.display.set_mode(c.SCREEN_SIZE)
-SCREEN_RECT = SCREEN.get_rect()
+GRAPHICS_DIR = os.path.join(os.path.dirname(__file__), "..", "resources", "graphics")
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "..", "resources", "cache")
 
-GFX = tools.load_all_gfx(
-    os.path.join(os.path.dirname(__file__), "..", "resources", "graphics")
-)
+# the screen is created by init(), images are loaded on first access
+SCREEN = None
+SCREEN_RECT = pg.Rect((0, 0), c.SCREEN_SIZE)
+
+GFX = tools.LazyGFX(GRAPHICS_DIR)
+ASSET_CACHE = tools.AssetCache(GFX, CACHE_DIR)
+
+
+def init(mode=c.DISPLAY_WINDOW):
+    """initialize pygame and create the surface the game is drawn on
+
+    mode is c.DISPLAY_WINDOW for a real window, c.DISPLAY_DUMMY to use the SDL
+    dummy video driver or c.DISPLAY_OFFSCREEN to draw on a plain Surface,
+    the last two don't need a display server.
+    """
+    global SCREEN
+    if mode != c.DISPLAY_WINDOW:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+    pg.init()
+    pg.event.set_allowed([pg.KEYDOWN, pg.KEYUP, pg.QUIT])
+    if mode == c.DISPLAY_OFFSCREEN:
+        # images are converted to the display format, so a video mode is needed
+        pg.display.set_mode((1, 1))
+        SCREEN = pg.Surface(c.SCREEN_SIZE).convert()
+    else:
+        pg.display.set_caption(c.ORIGINAL_CAPTION)
+        SCREEN = pg.display.set_mode(c.SCREEN_SIZE)
+    return SCREEN
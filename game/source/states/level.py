@@ -2,16 +2,32 @@ __author__ = "marble_xu"
 
 import os
 import json
+import math
 import pygame as pg
 from .. import setup, tools
 from .. import constants as c
 from ..components import info, stuff, player, brick, box, enemy, powerup, coin
+from ..components import background
 
 
 class Level(tools.State):
+    # the player states in which the other sprites don't move
+    frozen_states = frozenset(
+        (
+            c.SMALL_TO_BIG,
+            c.BIG_TO_SMALL,
+            c.BIG_TO_FIRE,
+            c.DEATH_JUMP,
+            c.DOWN_TO_PIPE,
+            c.UP_OUT_PIPE,
+        )
+    )
+
     def __init__(self):
         tools.State.__init__(self)
         self.player = None
+        self.score_pool = None
+        self.background = None
 
     def startup(self, current_time, persist):
         self.game_info = persist
@@ -20,7 +36,12 @@ class Level(tools.State):
         self.death_timer = 0
         self.castle_timer = 0
 
-        self.moving_score_list = []
+        if self.score_pool is None:
+            self.score_pool = stuff.ScorePool()
+        self.score_pool.clear()
+        powerup.fireball_pool.prewarm(c.FIREBALL_POOL_SIZE)
+        brick.piece_pool.prewarm(c.BRICK_PIECE_POOL_SIZE)
+        coin.coin_pool.prewarm(c.COIN_POOL_SIZE)
         self.overhead_info = info.Info(self.game_info, c.LEVEL)
         self.load_map()
         self.setup_background()
@@ -56,19 +77,24 @@ class Level(tools.State):
 
     def setup_background(self):
         img_name = self.map_data[c.MAP_IMAGE]
-        self.background = setup.GFX[img_name]
-        self.bg_rect = self.background.get_rect()
-        self.background = pg.transform.scale(
-            self.background,
-            (
-                int(self.bg_rect.width * c.BACKGROUND_MULTIPLER),
-                int(self.bg_rect.height * c.BACKGROUND_MULTIPLER),
-            ),
-        )
-        self.bg_rect = self.background.get_rect()
-
-        self.level = pg.Surface((self.bg_rect.w, self.bg_rect.h)).convert()
-        self.viewport = setup.SCREEN.get_rect(bottom=self.bg_rect.bottom)
+        # the background of the same image is kept when the level starts
+        # again, with its scaled tiles and the mapped cache
+        if self.background is None or self.background.name != img_name:
+            self.background = background.Background(img_name)
+        self.bg_rect = self.background.rect
+
+        self.viewport = setup.SCREEN_RECT.copy()
+        self.viewport.bottom = self.bg_rect.bottom
+        if c.NATIVE_RENDER:
+            self.native_surface = pg.Surface(
+                (
+                    math.ceil(self.viewport.w / c.BACKGROUND_MULTIPLER),
+                    math.ceil(self.viewport.h / c.BACKGROUND_MULTIPLER),
+                )
+            ).convert()
+            # the native frame is scaled into the same surface every frame
+            self.scaled_surface = pg.Surface(self.viewport.size).convert()
+            tools.REDRAWN_SURFACES.add(self.scaled_surface)
 
     def setup_maps(self):
         self.map_list = []
@@ -98,7 +124,7 @@ class Level(tools.State):
             self.player.up_pipe_y = self.player_y
 
     def setup_collide(self, name):
-        group = pg.sprite.Group()
+        group = tools.Group()
         if name in self.map_data:
             for data in self.map_data[name]:
                 group.add(
@@ -109,7 +135,7 @@ class Level(tools.State):
         return group
 
     def setup_pipe(self):
-        self.pipe_group = pg.sprite.Group()
+        self.pipe_group = tools.Group()
         if c.MAP_PIPE in self.map_data:
             for data in self.map_data[c.MAP_PIPE]:
                 self.pipe_group.add(
@@ -123,7 +149,7 @@ class Level(tools.State):
                 )
 
     def setup_slider(self):
-        self.slider_group = pg.sprite.Group()
+        self.slider_group = tools.Group()
         if c.MAP_SLIDER in self.map_data:
             for data in self.map_data[c.MAP_SLIDER]:
                 if c.VELOCITY in data:
@@ -143,7 +169,7 @@ class Level(tools.State):
                 )
 
     def setup_static_coin(self):
-        self.static_coin_group = pg.sprite.Group()
+        self.static_coin_group = tools.Group()
         if c.MAP_COIN in self.map_data:
             for data in self.map_data[c.MAP_COIN]:
                 self.static_coin_group.add(coin.StaticCoin(data["x"], data["y"]))
@@ -151,14 +177,14 @@ class Level(tools.State):
     def setup_brick_and_box(self):
         self.coin_group = pg.sprite.Group()
         self.powerup_group = pg.sprite.Group()
-        self.brick_group = pg.sprite.Group()
+        self.brick_group = tools.Group()
         self.brickpiece_group = pg.sprite.Group()
 
         if c.MAP_BRICK in self.map_data:
             for data in self.map_data[c.MAP_BRICK]:
                 brick.create_brick(self.brick_group, data, self)
 
-        self.box_group = pg.sprite.Group()
+        self.box_group = tools.Group()
         if c.MAP_BOX in self.map_data:
             for data in self.map_data[c.MAP_BOX]:
                 if data["type"] == c.TYPE_COIN:
@@ -193,7 +219,7 @@ class Level(tools.State):
             index += 1
 
     def setup_checkpoints(self):
-        self.checkpoint_group = pg.sprite.Group()
+        self.checkpoint_group = tools.Group()
         for data in self.map_data[c.MAP_CHECKPOINT]:
             if c.ENEMY_GROUPID in data:
                 enemy_groupid = data[c.ENEMY_GROUPID]
@@ -214,9 +240,10 @@ class Level(tools.State):
                     map_index,
                 )
             )
+        self.checkpoint_index = tools.XCursor(self.checkpoint_group)
 
     def setup_flagpole(self):
-        self.flagpole_group = pg.sprite.Group()
+        self.flagpole_group = tools.Group()
         if c.MAP_FLAGPOLE in self.map_data:
             for data in self.map_data[c.MAP_FLAGPOLE]:
                 if data["type"] == c.FLAGPOLE_TYPE_FLAG:
@@ -230,18 +257,51 @@ class Level(tools.State):
 
     def setup_sprite_groups(self):
         self.dying_group = pg.sprite.Group()
-        self.enemy_group = pg.sprite.Group()
+        self.enemy_group = tools.Group()
         self.shell_group = pg.sprite.Group()
 
-        self.ground_step_pipe_group = pg.sprite.Group(
+        self.ground_step_pipe_group = tools.Group(
             self.ground_group, self.pipe_group, self.step_group, self.slider_group
         )
         self.player_group = pg.sprite.Group(self.player)
 
+        self.ground_step_pipe_hash = tools.SpatialHash(
+            (self.ground_step_pipe_group,), (self.slider_group,)
+        )
+        self.brick_hash = tools.SpatialHash((self.brick_group,))
+        self.box_hash = tools.SpatialHash((self.box_group,))
+        # everything the player, enemies and powerups stand on or bump into
+        self.solids = tools.SpatialHash(
+            (self.ground_step_pipe_group, self.brick_group, self.box_group),
+            (self.slider_group,),
+        )
+        # answers the one pixel probes for ground and pipes under a sprite
+        self.occupancy = tools.Occupancy(
+            (self.ground_step_pipe_group, self.brick_group, self.box_group),
+            (self.slider_group,),
+        )
+        self.pipe_occupancy = tools.Occupancy((self.pipe_group,))
+        self.enemy_index = tools.SweepAndPrune(self.enemy_group)
+        self.activity = tools.ActivityWindow(
+            (self.enemy_group, self.shell_group, self.powerup_group)
+        )
+
+        # sprites of these groups never move horizontally
+        self.static_index = {
+            group: tools.XSortedIndex(group)
+            for group in (
+                self.brick_group,
+                self.box_group,
+                self.pipe_group,
+                self.static_coin_group,
+                self.flagpole_group,
+            )
+        }
+        self.draw_stats = {"submitted": 0, "culled": 0}
+
     def update(self, surface, keys, current_time):
         self.game_info[c.CURRENT_TIME] = self.current_time = current_time
         self.handle_states(keys)
-        self.draw(surface)
 
     def handle_states(self, keys):
         self.update_all_sprites(keys)
@@ -263,18 +323,21 @@ class Level(tools.State):
             self.check_checkpoints()
             self.update_viewport()
             self.overhead_info.update(self.game_info, self.player)
-            for score in self.moving_score_list:
-                score.update(self.moving_score_list)
+            self.score_pool.update()
         else:
             self.player.update(keys, self.game_info, self.powerup_group)
             self.flagpole_group.update()
             self.check_checkpoints()
+            self.activity.update(self.viewport)
             self.slider_group.update()
             self.static_coin_group.update(self.game_info)
-            self.enemy_group.update(self.game_info, self)
+            self.enemy_index.invalidate()
+            enemy.update_enemies(self.enemy_group, self.game_info, self)
+            self.enemy_index.update()
             self.shell_group.update(self.game_info, self)
             self.brick_group.update()
             self.box_group.update(self.game_info)
+            self.land_bumped_sprites()
             self.powerup_group.update(self.game_info, self)
             self.coin_group.update(self.game_info)
             self.brickpiece_group.update()
@@ -283,11 +346,10 @@ class Level(tools.State):
             self.check_for_player_death()
             self.update_viewport()
             self.overhead_info.update(self.game_info, self.player)
-            for score in self.moving_score_list:
-                score.update(self.moving_score_list)
+            self.score_pool.update()
 
     def check_checkpoints(self):
-        checkpoint = pg.sprite.spritecollideany(self.player, self.checkpoint_group)
+        checkpoint = self.checkpoint_index.collideany(self.player)
 
         if checkpoint:
             if checkpoint.type == c.CHECKPOINT_TYPE_ENEMY:
@@ -313,8 +375,9 @@ class Level(tools.State):
                     c.TYPE_LIFEMUSHROOM,
                     self.powerup_group,
                 )
-                mushroom_box.start_bump(self.moving_score_list)
+                mushroom_box.start_bump(self.score_pool)
                 self.box_group.add(mushroom_box)
+                self.occupancy.lift(mushroom_box)
                 self.player.y_vel = 7
                 self.player.rect.y = mushroom_box.rect.bottom
                 self.player.state = c.FALL
@@ -326,7 +389,7 @@ class Level(tools.State):
                 self.change_map(checkpoint.map_index, checkpoint.type)
             elif checkpoint.type == c.CHECKPOINT_TYPE_BOSS:
                 self.player.state = c.WALK_AUTO
-            checkpoint.kill()
+            self.checkpoint_group.remove(checkpoint)
 
     def update_flag_score(self):
         base_y = c.GROUND_HEIGHT - 80
@@ -359,12 +422,10 @@ class Level(tools.State):
             self.check_player_y_collisions()
 
     def check_player_x_collisions(self):
-        ground_step_pipe = pg.sprite.spritecollideany(
-            self.player, self.ground_step_pipe_group
-        )
-        brick = pg.sprite.spritecollideany(self.player, self.brick_group)
-        box = pg.sprite.spritecollideany(self.player, self.box_group)
-        enemy = pg.sprite.spritecollideany(self.player, self.enemy_group)
+        ground_step_pipe = self.ground_step_pipe_hash.collideany(self.player)
+        brick = self.brick_hash.collideany(self.player)
+        box = self.box_hash.collideany(self.player)
+        enemy = self.enemy_index.collideany(self.player)
         shell = pg.sprite.spritecollideany(self.player, self.shell_group)
         powerup = pg.sprite.spritecollideany(self.player, self.powerup_group)
         coin = pg.sprite.spritecollideany(self.player, self.static_coin_group)
@@ -456,16 +517,14 @@ class Level(tools.State):
         self.player.x_vel = 0
 
     def check_player_y_collisions(self):
-        ground_step_pipe = pg.sprite.spritecollideany(
-            self.player, self.ground_step_pipe_group
-        )
-        enemy = pg.sprite.spritecollideany(self.player, self.enemy_group)
+        ground_step_pipe = self.ground_step_pipe_hash.collideany(self.player)
+        enemy = self.enemy_index.collideany(self.player)
         shell = pg.sprite.spritecollideany(self.player, self.shell_group)
 
         # decrease runtime delay: when player is on the ground, don't check brick and box
         if self.player.rect.bottom < c.GROUND_HEIGHT:
-            brick = pg.sprite.spritecollideany(self.player, self.brick_group)
-            box = pg.sprite.spritecollideany(self.player, self.box_group)
+            brick = self.brick_hash.collideany(self.player)
+            box = self.box_hash.collideany(self.player)
             brick, box = self.prevent_collision_conflict(brick, box)
         else:
             brick, box = False, False
@@ -534,13 +593,15 @@ class Level(tools.State):
                     else:
                         if sprite.type == c.TYPE_COIN:
                             self.update_score(200, sprite, 1)
-                        sprite.start_bump(self.moving_score_list)
+                        sprite.start_bump(self.score_pool)
+                        self.occupancy.lift(sprite)
             elif sprite.name == c.MAP_BOX:
                 self.check_if_enemy_on_brick_box(sprite)
                 if sprite.state == c.RESTING:
                     if sprite.type == c.TYPE_COIN:
                         self.update_score(200, sprite, 1)
-                    sprite.start_bump(self.moving_score_list)
+                    sprite.start_bump(self.score_pool)
+                    self.occupancy.lift(sprite)
             elif sprite.name == c.MAP_PIPE and sprite.type == c.PIPE_TYPE_HORIZONTAL:
                 return
 
@@ -559,7 +620,7 @@ class Level(tools.State):
 
     def check_if_enemy_on_brick_box(self, brick):
         brick.rect.y -= 5
-        enemy = pg.sprite.spritecollideany(brick, self.enemy_group)
+        enemy = self.enemy_index.collideany(brick)
         if enemy:
             self.update_score(100, enemy, 0)
             self.move_to_dying_group(self.enemy_group, enemy)
@@ -571,25 +632,11 @@ class Level(tools.State):
         brick.rect.y += 5
 
     def in_frozen_state(self):
-        if (
-            self.player.state == c.SMALL_TO_BIG
-            or self.player.state == c.BIG_TO_SMALL
-            or self.player.state == c.BIG_TO_FIRE
-            or self.player.state == c.DEATH_JUMP
-            or self.player.state == c.DOWN_TO_PIPE
-            or self.player.state == c.UP_OUT_PIPE
-        ):
-            return True
-        else:
-            return False
+        return self.player.state in self.frozen_states
 
     def check_is_falling(self, sprite):
         sprite.rect.y += 1
-        check_group = pg.sprite.Group(
-            self.ground_step_pipe_group, self.brick_group, self.box_group
-        )
-
-        if pg.sprite.spritecollideany(sprite, check_group) is None:
+        if not self.occupancy.collide(sprite.rect):
             if sprite.state == c.WALK_AUTO or sprite.state == c.END_OF_LEVEL_FALL:
                 sprite.state = c.END_OF_LEVEL_FALL
             elif (
@@ -600,6 +647,12 @@ class Level(tools.State):
                 sprite.state = c.FALL
         sprite.rect.y -= 1
 
+    def land_bumped_sprites(self):
+        """put bricks and boxes back into the occupancy when their bump ends"""
+        for sprite in self.occupancy.lifted[:]:
+            if sprite.state != c.BUMPED:
+                self.occupancy.land(sprite)
+
     def check_for_player_death(self):
         if self.player.rect.y > c.SCREEN_HEIGHT or self.overhead_info.time <= 0:
             self.player.start_death_jump(self.game_info)
@@ -608,7 +661,9 @@ class Level(tools.State):
     def check_if_player_on_IN_pipe(self):
         """check if player is on the pipe which can go down in to it"""
         self.player.rect.y += 1
-        pipe = pg.sprite.spritecollideany(self.player, self.pipe_group)
+        pipe = None
+        if self.pipe_occupancy.collide(self.player.rect):
+            pipe = pg.sprite.spritecollideany(self.player, self.pipe_group)
         if pipe and pipe.type == c.PIPE_TYPE_IN:
             if (
                 self.player.crouching
@@ -654,28 +709,75 @@ class Level(tools.State):
         self.game_info[c.COIN_TOTAL] += coin_num
         x = sprite.rect.x
         y = sprite.rect.y - 10
-        self.moving_score_list.append(stuff.Score(x, y, score))
+        self.score_pool.add(x, y, score)
 
     def draw(self, surface):
-        self.level.blit(self.background, self.viewport, self.viewport)
-        self.powerup_group.draw(self.level)
-        self.brick_group.draw(self.level)
-        self.box_group.draw(self.level)
-        self.coin_group.draw(self.level)
-        self.dying_group.draw(self.level)
-        self.brickpiece_group.draw(self.level)
-        self.flagpole_group.draw(self.level)
-        self.shell_group.draw(self.level)
-        self.enemy_group.draw(self.level)
-        self.player_group.draw(self.level)
-        self.static_coin_group.draw(self.level)
-        self.slider_group.draw(self.level)
-        self.pipe_group.draw(self.level)
-        for score in self.moving_score_list:
-            score.draw(self.level)
+        """draw the level straight to surface, shifted by the viewport"""
+        self.draw_stats["submitted"] = self.draw_stats["culled"] = 0
+        if c.NATIVE_RENDER:
+            target = self.native_surface
+            self.background.draw_native(target, self.viewport)
+        else:
+            target = surface
+            self.background.draw(surface, self.viewport)
+        self.draw_group(target, self.powerup_group)
+        self.draw_group(target, self.brick_group)
+        self.draw_group(target, self.box_group)
+        self.draw_group(target, self.coin_group)
+        self.draw_group(target, self.dying_group)
+        self.draw_group(target, self.brickpiece_group)
+        self.draw_group(target, self.flagpole_group)
+        self.draw_group(target, self.shell_group)
+        self.draw_group(target, self.enemy_group)
+        self.draw_group(target, self.player_group)
+        self.draw_group(target, self.static_coin_group)
+        self.draw_group(target, self.slider_group)
+        self.draw_group(target, self.pipe_group)
         if c.DEBUG:
-            self.ground_step_pipe_group.draw(self.level)
-            self.checkpoint_group.draw(self.level)
+            self.draw_group(target, self.ground_step_pipe_group)
+            self.draw_group(target, self.checkpoint_group)
+        if c.NATIVE_RENDER:
+            pg.transform.scale(target, self.viewport.size, self.scaled_surface)
+            surface.blit(self.scaled_surface, (0, 0))
 
-        surface.blit(self.level, (0, 0), self.viewport)
+        self.score_pool.draw(surface, (-self.viewport.x, -self.viewport.y))
         self.overhead_info.draw(surface)
+
+    def draw_group(self, surface, group):
+        """blit only the sprites of group inside the viewport"""
+        viewport = self.viewport
+        if group in self.static_index:
+            sprites = self.static_index[group].query(viewport.left, viewport.right)
+        else:
+            sprites = group.sprites()
+
+        offset_x, offset_y = -viewport.x, -viewport.y
+        submitted = 0
+        for sprite in sprites:
+            # the image is blitted at the top left of the rect and may be
+            # larger than it, e.g. an exploding fireball
+            if viewport.colliderect(sprite.rect.topleft + sprite.image.get_size()):
+                if c.NATIVE_RENDER:
+                    self.blit_native(surface, sprite.image, sprite.rect)
+                else:
+                    surface.blit(sprite.image, sprite.rect.move(offset_x, offset_y))
+                submitted += 1
+        self.draw_stats["submitted"] += submitted
+        self.draw_stats["culled"] += len(group) - submitted
+
+    def blit_native(self, surface, image, rect):
+        """blit the sprite sheet resolution image to the native surface, the
+        image keeps the bottom center of rect"""
+        native = tools.get_native_image(image)
+        alpha = image.get_alpha()
+        if alpha is not None and native.get_alpha() != alpha:
+            native.set_alpha(alpha)
+        centerx = (rect.centerx - self.viewport.x) / c.BACKGROUND_MULTIPLER
+        bottom = (rect.bottom - self.viewport.y) / c.BACKGROUND_MULTIPLER
+        surface.blit(
+            native,
+            (
+                round(centerx - native.get_width() / 2),
+                round(bottom) - native.get_height(),
+            ),
+        )
@@ -26,16 +26,20 @@ class LoadScreen(tools.State):
         return c.LOAD_SCREEN
 
     def update(self, surface, keys, current_time):
+        self.current_time = current_time
         if (current_time - self.start_time) < self.time_list[0]:
-            surface.fill(c.BLACK)
             self.overhead_info.update(self.game_info)
+        elif (current_time - self.start_time) >= self.time_list[2]:
+            self.done = True
+
+    def draw(self, surface):
+        if (self.current_time - self.start_time) < self.time_list[0]:
+            surface.fill(c.BLACK)
             self.overhead_info.draw(surface)
-        elif (current_time - self.start_time) < self.time_list[1]:
+        elif (self.current_time - self.start_time) < self.time_list[1]:
             surface.fill(c.BLACK)
-        elif (current_time - self.start_time) < self.time_list[2]:
+        elif (self.current_time - self.start_time) < self.time_list[2]:
             surface.fill((106, 150, 252))
-        else:
-            self.done = True
 
 
 class GameOver(LoadScreen):
@@ -4,7 +4,7 @@ import pygame as pg
 from .. import tools
 from .. import setup
 from .. import constants as c
-from ..components import info
+from ..components import info, background
 
 
 class Menu(tools.State):
@@ -32,17 +32,10 @@ class Menu(tools.State):
         self.setup_cursor()
 
     def setup_background(self):
-        self.background = setup.GFX["level_1"]
-        self.background_rect = self.background.get_rect()
-        self.background = pg.transform.scale(
-            self.background,
-            (
-                int(self.background_rect.width * c.BACKGROUND_MULTIPLER),
-                int(self.background_rect.height * c.BACKGROUND_MULTIPLER),
-            ),
-        )
+        self.background = background.Background("level_1")
+        self.background_rect = self.background.rect
 
-        self.viewport = setup.SCREEN.get_rect(bottom=setup.SCREEN_RECT.bottom)
+        self.viewport = setup.SCREEN_RECT.copy()
         self.image_dict = {}
         image = tools.get_image(
             setup.GFX["title_screen"], 1, 60, 176, 88, (255, 0, 220), c.SIZE_MULTIPLIER
@@ -79,7 +72,8 @@ class Menu(tools.State):
         self.update_cursor(keys)
         self.overhead_info.update(self.game_info)
 
-        surface.blit(self.background, self.viewport, self.viewport)
+    def draw(self, surface):
+        self.background.draw(surface, self.viewport)
         surface.blit(
             self.image_dict["GAME_NAME_BOX"][0], self.image_dict["GAME_NAME_BOX"][1]
         )
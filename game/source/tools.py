@@ -1,8 +1,24 @@
 __author__ = "marble_xu"
 
 import os
+import json
+import mmap
+import time
+import bisect
+import weakref
+import tempfile
 import pygame as pg
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Mapping
+from . import constants as c
+
+try:
+    import fcntl
+except ImportError:
+    # no lock on windows, processes filling the cache at the same time may
+    # drop each other's manifest entries, which are rebuilt on the next start
+    fcntl = None
 
 keybinding = {
     "action": pg.K_s,
@@ -33,10 +49,122 @@ class State:
     def update(sefl, surface, keys, current_time):
         """abstract method"""
 
+    @abstractmethod
+    def draw(self, surface):
+        """abstract method"""
+
+
+class StateMachine:
+    """mixin for the sprites which are driven by an integer state id
+
+    state_methods maps a state id to the name of the method handling it,
+    every subclass turns it into its state_handlers table, so overridden
+    methods are used. handle_state() finds the handler of the current state
+    with one dict lookup. assigning self.state calls the transition hooks,
+    and with c.PROFILE_STATES the time spent in every state is added up in
+    STATE_TIMES.
+    """
+
+    state_methods = {}
+    state_handlers = {}
+    transition_hooks = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.state_handlers = {
+            state: getattr(cls, name) for state, name in cls.state_methods.items()
+        }
+
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, state):
+        previous = getattr(self, "_state", None)
+        self._state = state
+        if previous != state:
+            for hook in self.transition_hooks:
+                hook(self, previous, state)
+
+    def add_transition_hook(self, hook):
+        """call hook(sprite, previous, state) when the state changes"""
+        self.transition_hooks = self.transition_hooks + (hook,)
+
+    def handle_state(self, *args):
+        state = self._state
+        handler = self.state_handlers.get(state)
+        if handler is None:
+            return
+        if not c.PROFILE_STATES:
+            handler(self, *args)
+            return
+        # the time goes to the state which ran, even if the handler changed it
+        start = time.perf_counter()
+        handler(self, *args)
+        key = (type(self).__name__, c.STATE_NAMES[state])
+        STATE_TIMES[key] = STATE_TIMES.get(key, 0) + time.perf_counter() - start
+
+
+# seconds spent in each (class name, state name), filled with c.PROFILE_STATES
+STATE_TIMES = {}
+
+
+class RealTimeClock:
+    """game time is the wall clock time since pygame was initialized"""
+
+    def tick(self):
+        return pg.time.get_ticks()
+
+
+class FixedStepClock:
+    """game time goes on exactly 1000 / fps milliseconds every frame,
+    however fast the frames are run, so a headless run plays like an
+    interactive one at fps"""
+
+    def __init__(self, fps=60):
+        self.fps = fps
+        self.frame = 0
+
+    def tick(self):
+        current_time = self.frame * 1000 // self.fps
+        self.frame += 1
+        return current_time
+
 
 class Control:
-    def __init__(self):
-        self.screen = pg.display.get_surface()
+    """a headless Control never updates the display or waits for the next
+    frame, so it runs as fast as it can (use a screen of c.DISPLAY_DUMMY or
+    c.DISPLAY_OFFSCREEN). otherwise only every render_every-th frame is
+    shown, which fast forwards the game by that factor. the game time of a
+    frame comes from game_clock, a RealTimeClock by default
+
+    the state is drawn every draw_every-th frame, or only when draw() is
+    called if draw_every is 0. frames which aren't drawn aren't shown"""
+
+    def __init__(
+        self,
+        screen=None,
+        dirty_rects=False,
+        headless=False,
+        render_every=1,
+        game_clock=None,
+        draw_every=1,
+    ):
+        if screen is None:
+            screen = pg.display.get_surface()
+        self.dirty_rects = dirty_rects
+        if dirty_rects:
+            screen = DirtySurface(screen)
+        self.screen = screen
+        self.headless = headless
+        self.render_every = render_every
+        if game_clock is None:
+            game_clock = RealTimeClock()
+        self.game_clock = game_clock
+        self.draw_every = draw_every
+        self.drawn = False
+        self.frame = 0
         self.done = False
         self.clock = pg.time.Clock()
         self.fps = 60
@@ -52,10 +180,19 @@ class Control:
         self.state = self.state_dict[self.state_name]
 
     def update(self):
-        self.current_time = pg.time.get_ticks()
+        self.current_time = self.game_clock.tick()
         if self.state.done:
             self.flip_state()
         self.state.update(self.screen, self.keys, self.current_time)
+        self.drawn = bool(self.draw_every) and self.frame % self.draw_every == 0
+        if self.drawn:
+            self.state.draw(self.screen)
+        self.frame += 1
+
+    def draw(self):
+        """draw the current frame on request"""
+        self.state.draw(self.screen)
+        self.drawn = True
 
     def flip_state(self):
         previous, self.state_name = self.state_name, self.state.next
@@ -72,24 +209,780 @@ class Control:
             elif event.type == pg.KEYUP:
                 self.keys = pg.key.get_pressed()
 
-    def main(self):
-        while not self.done:
+    def main(self, max_frames=None):
+        """run until the window is closed, or for max_frames frames"""
+        while not self.done and (max_frames is None or self.frame < max_frames):
             self.event_loop()
             self.update()
+            self.present()
+
+    def present(self):
+        """show the frame and wait for the next one"""
+        shown = self.drawn and (self.frame - 1) % self.render_every == 0
+        self.drawn = False
+        if self.headless or not shown:
+            if self.dirty_rects:
+                self.screen.skip_frame()
+            return
+        self.update_display()
+        self.clock.tick(self.fps)
+
+    def update_display(self):
+        rects = self.screen.get_dirty_rects() if self.dirty_rects else None
+        if rects is None:
             pg.display.update()
-            self.clock.tick(self.fps)
+        elif rects:
+            pg.display.update(rects)
+
+
+# surfaces which are drawn again in place every frame, like the scaled frame
+# of c.NATIVE_RENDER. a DirtySurface always counts their blits as changed
+REDRAWN_SURFACES = weakref.WeakSet()
+
+
+class DirtySurface:
+    """wrapper of the screen which records every blit and fill of a frame
+
+    get_dirty_rects() compares the records with the ones of the previous
+    frame and returns the regions which changed, or None when most of the
+    screen changed (e.g. the viewport scrolled) and a full update is cheaper.
+
+    blit, blits (used by pg.sprite.Group.draw), fill and the get_* methods
+    are safe to use. any other Surface method called through the wrapper,
+    e.g. set_at or subsurface, may draw where it isn't recorded, so the
+    frame gets a full update. pg.draw functions need the wrapped surface.
+    """
+
+    # Surface methods which don't draw, besides the get_* ones
+    READ_ONLY = frozenset(("copy", "convert", "convert_alpha", "mustlock"))
+
+    def __init__(self, surface):
+        self.surface = surface
+        self.area = surface.get_width() * surface.get_height()
+        self.records = []
+        self.last_records = []
+        self.untracked = False
+
+    def __getattr__(self, name):
+        if not (name.startswith("get_") or name in self.READ_ONLY):
+            self.untracked = True
+        return getattr(self.surface, name)
+
+    def blit(self, source, dest, area=None, special_flags=0):
+        rect = self.surface.blit(source, dest, area, special_flags)
+        if rect.w and rect.h:
+            # keep the image itself, the alpha is changed in place by the
+            # player. a new object never equals the record of the last frame
+            state = object() if source in REDRAWN_SURFACES else source.get_alpha()
+            self.records.append((source, state, tuple(rect), area and tuple(area)))
+        return rect
+
+    def blits(self, blit_sequence, doreturn=1):
+        rects = [self.blit(*item) for item in blit_sequence]
+        return rects if doreturn else None
+
+    def fill(self, color, rect=None, special_flags=0):
+        rect = self.surface.fill(color, rect, special_flags)
+        self.records.append((None, tuple(color), tuple(rect), None))
+        return rect
+
+    def skip_frame(self):
+        """forget the blits of a frame which isn't shown"""
+        self.records = []
+
+    def get_dirty_rects(self):
+        records, last_records = self.records, self.last_records
+        self.last_records, self.records = records, []
+        if self.untracked:
+            # the next frame is updated in full too, it has to cover what
+            # the untracked call drew
+            self.untracked = False
+            self.last_records = None
+            return None
+        if last_records is None:
+            return None
+
+        changed = set(records).symmetric_difference(last_records)
+        if not changed:
+            if records != last_records:
+                # same blits in a different order
+                return None
+            return []
+
+        rects = [pg.Rect(record[2]) for record in changed]
+        if sum(rect.w * rect.h for rect in rects) > self.area * c.DIRTY_FULL_UPDATE:
+            return None
+        return rects
+
+
+class Record:
+    """slotted stand-in for a sprite which is never drawn, like the map
+    colliders and checkpoints. it has a rect and can be put in a Group, but
+    doesn't remember the groups it is in, so kill() does nothing, remove it
+    from the group instead. the image is only made to draw it in DEBUG"""
+
+    __slots__ = ()
+    debug_color = c.BLACK
+    debug_images = {}
+
+    @property
+    def image(self):
+        key = (self.rect.size, self.debug_color)
+        if key not in Record.debug_images:
+            image = pg.Surface(self.rect.size).convert()
+            image.fill(self.debug_color)
+            Record.debug_images[key] = image
+        return Record.debug_images[key]
+
+    def add_internal(self, group):
+        pass
+
+    def remove_internal(self, group):
+        pass
+
+    def update(self, *args):
+        pass
+
+    def kill(self):
+        pass
+
+
+class Group(pg.sprite.Group):
+    """sprite group which counts the sprites added and removed, so an index
+    built over the group knows when it has to be rebuilt. listeners are
+    told about every sprite which joins or leaves the group. it also holds
+    Records next to the sprites."""
+
+    def __init__(self, *sprites):
+        self.version = 0
+        self.listeners = []
+        pg.sprite.Group.__init__(self, *sprites)
+
+    def add(self, *sprites):
+        for sprite in sprites:
+            if isinstance(sprite, Record):
+                if not self.has_internal(sprite):
+                    self.add_internal(sprite)
+            else:
+                pg.sprite.Group.add(self, sprite)
+
+    def remove(self, *sprites):
+        for sprite in sprites:
+            if isinstance(sprite, Record):
+                if self.has_internal(sprite):
+                    self.remove_internal(sprite)
+            else:
+                pg.sprite.Group.remove(self, sprite)
+
+    def add_internal(self, sprite, *args):
+        pg.sprite.Group.add_internal(self, sprite, *args)
+        self.version += 1
+        for listener in self.listeners:
+            listener.sprite_added(self, sprite)
+
+    def remove_internal(self, sprite):
+        pg.sprite.Group.remove_internal(self, sprite)
+        self.version += 1
+        for listener in self.listeners:
+            listener.sprite_removed(self, sprite)
+
+
+class XSortedIndex:
+    """sprites of a Group sorted by rect.x, for sprites which never move
+    horizontally (bricks, boxes, pipes, ...)"""
+
+    def __init__(self, group):
+        self.group = group
+        self.version = None
+
+    def build(self):
+        sprites = list(self.group)
+        self.order = {sprite: i for i, sprite in enumerate(sprites)}
+        sprites.sort(key=lambda sprite: sprite.rect.x)
+        self.sprites = sprites
+        self.lefts = [sprite.rect.x for sprite in sprites]
+        self.max_width = max([sprite.rect.w for sprite in sprites] or [0])
+        self.version = self.group.version
+
+    def query(self, left, right):
+        """return the sprites which may overlap the x range [left, right),
+        in the order of the group"""
+        if self.version != self.group.version:
+            self.build()
+        start = bisect.bisect_left(self.lefts, left - self.max_width)
+        end = bisect.bisect_left(self.lefts, right)
+        sprites = self.sprites[start:end]
+        sprites.sort(key=self.order.__getitem__)
+        return sprites
+
+
+class XCursor(XSortedIndex):
+    """XSortedIndex with a window over the sprites near a moving sprite
+
+    the window is moved a step at a time when the sprite moves, so a query
+    only looks at the sprites around it. it moves back the same way when
+    the sprite jumps backwards (e.g. to another map).
+    """
+
+    def build(self):
+        XSortedIndex.build(self)
+        self.start = min(getattr(self, "start", 0), len(self.lefts))
+        self.end = min(getattr(self, "end", 0), len(self.lefts))
+
+    def collideany(self, sprite):
+        """return the first sprite in the order of the group which collides
+        with sprite, like pg.sprite.spritecollideany"""
+        if self.version != self.group.version:
+            self.build()
+        rect = sprite.rect
+        lefts = self.lefts
+        # the window holds the sprites with low < rect.left < rect.right
+        low = rect.left - self.max_width
+        while self.start > 0 and lefts[self.start - 1] > low:
+            self.start -= 1
+        while self.start < len(lefts) and lefts[self.start] <= low:
+            self.start += 1
+        while self.end > 0 and lefts[self.end - 1] >= rect.right:
+            self.end -= 1
+        while self.end < len(lefts) and lefts[self.end] < rect.right:
+            self.end += 1
+
+        found = None
+        for other in self.sprites[self.start : self.end]:
+            if rect.colliderect(other.rect):
+                if found is None or self.order[other] < self.order[found]:
+                    found = other
+        return found
+
+
+class SpatialHash:
+    """uniform grid over the sprites of some Groups for collision queries
+
+    the grid listens to the groups, a sprite is put in or taken out of its
+    cells when it joins or leaves one of them, e.g. when a brick breaks or
+    a box appears. sprites of the moving groups (sliders) are not put in
+    the grid but checked one by one. the groups must not share sprites.
+    """
+
+    def __init__(self, groups, moving=(), cell_size=c.COLLISION_CELL_SIZE):
+        self.groups = groups
+        self.moving = moving
+        self.cell_size = cell_size
+        self.count = 0
+        self.order = {}
+        self.sprite_cells = {}
+        self.movers = []
+        self.cells = {}
+        for group in groups:
+            for sprite in group:
+                self.sprite_added(group, sprite)
+            group.listeners.append(self)
+
+    def sprite_added(self, group, sprite):
+        # sprites are ordered like in pg.sprite.Group(*groups)
+        self.order[sprite] = (self.groups.index(group), self.count)
+        self.count += 1
+        if any(sprite in moving for moving in self.moving):
+            self.movers.append(sprite)
+            return
+
+        # one more row above and below, a bumped brick or box moves up and
+        # a box falls a few pixels below its rest height before it stops
+        left, top, right, bottom = self.get_cells(sprite.rect)
+        keys = [
+            (x, y) for y in range(top - 1, bottom + 2) for x in range(left, right + 1)
+        ]
+        for key in keys:
+            self.cells.setdefault(key, []).append(sprite)
+        self.sprite_cells[sprite] = keys
+
+    def sprite_removed(self, group, sprite):
+        del self.order[sprite]
+        keys = self.sprite_cells.pop(sprite, None)
+        if keys is None:
+            self.movers.remove(sprite)
+            return
+        for key in keys:
+            cell = self.cells[key]
+            cell.remove(sprite)
+            if not cell:
+                del self.cells[key]
+
+    def sprites(self):
+        """return the sprites in the order of the groups"""
+        return sorted(self.order, key=self.order.__getitem__)
+
+    def get_cells(self, rect):
+        size = self.cell_size
+        return (
+            rect.left // size,
+            rect.top // size,
+            (rect.right - 1) // size,
+            (rect.bottom - 1) // size,
+        )
+
+    def query(self, rect):
+        """return the sprites which may collide with rect, in the order of
+        the groups"""
+        left, top, right, bottom = self.get_cells(rect)
+        found = set(self.movers)
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                found.update(self.cells.get((x, y), ()))
+        return sorted(found, key=self.order.__getitem__)
+
+    def collideany(self, sprite):
+        """return the first sprite in the order of the groups which collides
+        with sprite, like pg.sprite.spritecollideany"""
+        rect = sprite.rect
+        found = None
+        found_order = None
+        left, top, right, bottom = self.get_cells(rect)
+        for y in range(top, bottom + 1):
+            for x in range(left, right + 1):
+                for other in self.cells.get((x, y), ()):
+                    if rect.colliderect(other.rect):
+                        order = self.order[other]
+                        if found is None or order < found_order:
+                            found = other
+                            found_order = order
+        for other in self.movers:
+            if rect.colliderect(other.rect):
+                order = self.order[other]
+                if found is None or order < found_order:
+                    found = other
+                    found_order = order
+        return found
+
+
+class Occupancy:
+    """bitmap of the pixels covered by the sprites of some Groups
 
+    rows covered by the same sprites are merged into a band, and a band is
+    an int with one bit per pixel column, so asking whether anything is
+    under a rect doesn't look at the sprites. sprites of the moving groups
+    and sprites lifted out of the bitmap (a bumped brick) are checked one
+    by one, a lifted sprite is put back when it lands. a sprite which joins
+    or leaves the bitmap only changes the bands it covers.
+    """
 
-def get_image(sheet, x, y, width, height, colorkey, scale):
-    image = pg.Surface([width, height])
+    def __init__(self, groups, moving=()):
+        self.moving = moving
+        self.rects = {}
+        self.movers = []
+        self.lifted = []
+        for group in groups:
+            for sprite in group:
+                if any(sprite in moving for moving in self.moving):
+                    self.movers.append(sprite)
+                else:
+                    self.rects[sprite] = sprite.rect.copy()
+            group.listeners.append(self)
+        self.build()
+
+    def sprite_added(self, group, sprite):
+        if any(sprite in moving for moving in self.moving):
+            self.movers.append(sprite)
+        else:
+            self.insert(sprite)
+
+    def sprite_removed(self, group, sprite):
+        if sprite in self.rects:
+            self.erase(sprite)
+        elif sprite in self.lifted:
+            self.lifted.remove(sprite)
+        else:
+            self.movers.remove(sprite)
+
+    def lift(self, sprite):
+        """take a sprite which starts to move out of the bitmap"""
+        if sprite in self.rects:
+            self.erase(sprite)
+            self.lifted.append(sprite)
+
+    def land(self, sprite):
+        """put a lifted sprite back at its current position"""
+        self.lifted.remove(sprite)
+        self.insert(sprite)
+
+    def build(self):
+        rects = [rect for rect in self.rects.values() if rect.w > 0 and rect.h > 0]
+        self.origin = min([rect.left for rect in rects] or [0])
+        edges = sorted({rect.top for rect in rects} | {rect.bottom for rect in rects})
+        # band i covers the rows from tops[i] to tops[i + 1]
+        self.tops = edges
+        self.masks = []
+        self.band_sprites = []
+        for top, bottom in zip(edges, edges[1:]):
+            sprites = [
+                sprite
+                for sprite, rect in self.rects.items()
+                if rect.w > 0 and rect.top <= top and rect.bottom >= bottom
+            ]
+            self.band_sprites.append(sprites)
+            self.masks.append(self.get_mask(sprites))
+
+    def get_mask(self, sprites):
+        mask = 0
+        for sprite in sprites:
+            rect = self.rects[sprite]
+            mask |= ((1 << rect.w) - 1) << (rect.left - self.origin)
+        return mask
+
+    def split(self, y):
+        """make y the edge of a band and return its index in tops, the old
+        edges are kept so the bands only ever get split"""
+        index = bisect.bisect_left(self.tops, y)
+        if index < len(self.tops) and self.tops[index] == y:
+            return index
+        self.tops.insert(index, y)
+        if len(self.tops) == 1:
+            return index
+        if index == 0:
+            self.masks.insert(0, 0)
+            self.band_sprites.insert(0, [])
+        elif index == len(self.tops) - 1:
+            self.masks.append(0)
+            self.band_sprites.append([])
+        else:
+            self.masks.insert(index, self.masks[index - 1])
+            self.band_sprites.insert(index, list(self.band_sprites[index - 1]))
+        return index
+
+    def insert(self, sprite):
+        rect = sprite.rect.copy()
+        self.rects[sprite] = rect
+        if rect.w <= 0 or rect.h <= 0:
+            return
+        if rect.left < self.origin:
+            shift = self.origin - rect.left
+            self.masks = [mask << shift for mask in self.masks]
+            self.origin = rect.left
+        first = self.split(rect.top)
+        last = self.split(rect.bottom)
+        bits = ((1 << rect.w) - 1) << (rect.left - self.origin)
+        for index in range(first, last):
+            self.band_sprites[index].append(sprite)
+            self.masks[index] |= bits
+
+    def erase(self, sprite):
+        rect = self.rects.pop(sprite)
+        if rect.w <= 0 or rect.h <= 0:
+            return
+        first = bisect.bisect_left(self.tops, rect.top)
+        last = bisect.bisect_left(self.tops, rect.bottom)
+        for index in range(first, last):
+            sprites = self.band_sprites[index]
+            sprites.remove(sprite)
+            self.masks[index] = self.get_mask(sprites)
+
+    def collide(self, rect):
+        """return True if a sprite of the groups collides with rect"""
+        left = rect.left - self.origin
+        width = rect.w
+        if left < 0:
+            width += left
+            left = 0
+        if width > 0 and rect.h > 0:
+            columns = ((1 << width) - 1) << left
+            index = max(0, bisect.bisect_right(self.tops, rect.top) - 1)
+            while index < len(self.masks) and self.tops[index] < rect.bottom:
+                if self.masks[index] & columns:
+                    return True
+                index += 1
+        for sprite in self.movers:
+            if rect.colliderect(sprite.rect):
+                return True
+        for sprite in self.lifted:
+            if rect.colliderect(sprite.rect):
+                return True
+        return False
+
+
+class SweepAndPrune:
+    """broadphase for the collisions of moving sprites with a Group
+
+    update() sorts the sprites by rect.left after they moved, which is
+    cheap because their order hardly changes between frames. until they
+    move again a query only checks the sprites whose x range overlaps the
+    one of the query, before that it checks every sprite of the group.
+    """
+
+    def __init__(self, group):
+        self.group = group
+        self.sprites = []
+        self.version = None
+        self.valid = False
+
+    def invalidate(self):
+        """the sprites are about to move"""
+        self.valid = False
+
+    def update(self):
+        if self.version != self.group.version:
+            sprites = [sprite for sprite in self.sprites if sprite in self.group]
+            known = set(sprites)
+            sprites.extend(sprite for sprite in self.group if sprite not in known)
+            self.sprites = sprites
+            self.order = {sprite: i for i, sprite in enumerate(self.group)}
+            self.version = self.group.version
+        # timsort takes linear time on the almost sorted list
+        self.sprites.sort(key=lambda sprite: sprite.rect.left)
+        self.lefts = [sprite.rect.left for sprite in self.sprites]
+        self.max_width = max([sprite.rect.w for sprite in self.sprites] or [0])
+        self.valid = True
+
+    def collideany(self, sprite):
+        """return the first sprite in the order of the group which collides
+        with sprite, like pg.sprite.spritecollideany"""
+        if not self.valid:
+            return pg.sprite.spritecollideany(sprite, self.group)
+        if self.version != self.group.version:
+            self.update()
+        rect = sprite.rect
+        start = bisect.bisect_right(self.lefts, rect.left - self.max_width)
+        end = bisect.bisect_left(self.lefts, rect.right)
+        found = None
+        for other in self.sprites[start:end]:
+            if rect.colliderect(other.rect):
+                if found is None or self.order[other] < self.order[found]:
+                    found = other
+        return found
+
+
+class ActivityWindow:
+    """puts the sprites of some Groups to sleep when they are further than
+    margin from the viewport, and wakes them up when it comes close again
+
+    a sleeping sprite is taken out of its group, so it isn't updated, drawn
+    or collided with. it doesn't move while it sleeps, so the sleepers are
+    kept sorted by rect.x and waking up only looks at the ones in the window.
+    """
+
+    def __init__(self, groups, margin=c.ACTIVITY_MARGIN):
+        self.groups = groups
+        self.margin = margin
+        self.lefts = []
+        self.sleepers = []
+        self.max_width = 0
+        self.slept = 0
+        self.woken = 0
+
+    def update(self, viewport):
+        if self.margin is None:
+            return
+        left = viewport.left - self.margin
+        right = viewport.right + self.margin
+
+        start = bisect.bisect_right(self.lefts, left - self.max_width)
+        end = bisect.bisect_left(self.lefts, right)
+        for i in range(end - 1, start - 1, -1):
+            sprite, group = self.sleepers[i]
+            if sprite.rect.right > left:
+                del self.lefts[i]
+                del self.sleepers[i]
+                group.add(sprite)
+                self.woken += 1
+
+        for group in self.groups:
+            for sprite in group.sprites():
+                if sprite.rect.right <= left or sprite.rect.left >= right:
+                    group.remove(sprite)
+                    i = bisect.bisect_right(self.lefts, sprite.rect.left)
+                    self.lefts.insert(i, sprite.rect.left)
+                    self.sleepers.insert(i, (sprite, group))
+                    self.max_width = max(self.max_width, sprite.rect.w)
+                    self.slept += 1
+
+    def stats(self):
+        return {
+            "active": sum(len(group) for group in self.groups),
+            "sleeping": len(self.sleepers),
+            "slept": self.slept,
+            "woken": self.woken,
+        }
+
+
+class SpritePool:
+    """sprites of one class which are reused once they are killed, for the
+    short lived ones like fireballs and brick pieces. the class is made
+    without arguments and has a reset method taking the arguments of
+    acquire, it gives its sprites back to the pool through Pooled.kill"""
+
+    def __init__(self, sprite_class):
+        self.sprite_class = sprite_class
+        self.free = []
+        self.created = 0
+        self.reused = 0
+        self.released = 0
+
+    def prewarm(self, size):
+        while len(self.free) < size:
+            self.free.append(self.create())
+
+    def create(self):
+        sprite = self.sprite_class()
+        sprite.pool = self
+        self.created += 1
+        return sprite
+
+    def acquire(self, *args):
+        if self.free:
+            sprite = self.free.pop()
+            self.reused += 1
+        else:
+            sprite = self.create()
+        sprite.reset(*args)
+        return sprite
+
+    def release(self, sprite):
+        self.free.append(sprite)
+        self.released += 1
+
+    def stats(self):
+        return {
+            "free": len(self.free),
+            "created": self.created,
+            "reused": self.reused,
+            "released": self.released,
+        }
+
+
+class Pooled:
+    """mixin for the sprites of a SpritePool"""
+
+    pool = None
+
+    def kill(self):
+        if self.alive():
+            pg.sprite.Sprite.kill(self)
+            if self.pool is not None:
+                self.pool.release(self)
+
+
+class FrameCache:
+    """process wide cache of the frames cut from the sprite sheets
+
+    a frame is keyed by (sheet, rect, colorkey, scale, flip), so sprites which
+    use the same tile share one Surface instead of cutting and scaling it again.
+    the least recently used frames are dropped when max_bytes is exceeded.
+    """
+
+    def __init__(self, max_bytes=c.FRAME_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.frames = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        image = self.frames.get(key)
+        if image is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.frames.move_to_end(key)
+        return image
+
+    def add(self, key, image):
+        size = image.get_pitch() * image.get_height()
+        if size > self.max_bytes:
+            return
+        self.frames[key] = image
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            _, old_image = self.frames.popitem(last=False)
+            self.bytes -= old_image.get_pitch() * old_image.get_height()
+            self.evictions += 1
+
+    def clear(self):
+        self.frames.clear()
+        self.bytes = 0
+
+    def stats(self):
+        return {
+            "frames": len(self.frames),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+FRAME_CACHE = FrameCache()
+
+# sprite sheet resolution version of the frames, used by c.NATIVE_RENDER
+NATIVE_FRAMES = weakref.WeakKeyDictionary()
+
+
+def get_image(sheet, x, y, width, height, colorkey, scale, flip=(False, False)):
+    """the returned Surface is shared through FRAME_CACHE, copy it before
+    changing it in place (e.g. set_alpha)"""
+    key = (sheet, x, y, width, height, colorkey, scale, flip)
+    image = FRAME_CACHE.get(key)
+    if image is not None:
+        return image
+
+    native = pg.Surface([width, height])
+    native.blit(sheet, (0, 0), (x, y, width, height))
+    native.set_colorkey(colorkey)
+    image = scale_image(native, scale)
+    if flip[0] or flip[1]:
+        native = pg.transform.flip(native, *flip)
+        image = pg.transform.flip(image, *flip)
+    NATIVE_FRAMES[image] = native
+    FRAME_CACHE.add(key, image)
+    return image
+
+
+def copy_image(image, flip=(False, False)):
+    """copy of a get_image frame, flipped by flip, which keeps the sprite
+    sheet resolution version of the frame"""
+    if flip[0] or flip[1]:
+        copy = pg.transform.flip(image, *flip)
+    else:
+        copy = image.copy()
+    native = NATIVE_FRAMES.get(image)
+    if native is not None:
+        NATIVE_FRAMES[copy] = pg.transform.flip(native, *flip)
+    return copy
+
+
+def set_native_image(image, scale):
+    """keep image scaled down by scale, the multiplier its frames were cut
+    with, as the sprite sheet resolution version of a composite image"""
     rect = image.get_rect()
+    NATIVE_FRAMES[image] = pg.transform.scale(
+        image, (max(1, round(rect.w / scale)), max(1, round(rect.h / scale)))
+    )
 
-    image.blit(sheet, (0, 0), (x, y, width, height))
-    image.set_colorkey(colorkey)
-    image = pg.transform.scale(
+
+def get_native_image(image, scale=c.SIZE_MULTIPLIER):
+    """return image at the resolution of the sprite sheets, images which
+    were not cut by get_image are scaled down by scale once"""
+    native = NATIVE_FRAMES.get(image)
+    if native is None:
+        set_native_image(image, scale)
+        native = NATIVE_FRAMES[image]
+    return native
+
+
+def scale_image(image, scale):
+    rect = image.get_rect()
+    return pg.transform.scale(
         image, (int(rect.width * scale), int(rect.height * scale))
     )
-    return image
+
+
+def load_gfx(path, colorkey=(255, 0, 255)):
+    img = pg.image.load(path)
+    if img.get_alpha():
+        img = img.convert_alpha()
+    else:
+        img = img.convert()
+        img.set_colorkey(colorkey)
+    return img
 
 
 def load_all_gfx(
@@ -99,11 +992,145 @@ def load_all_gfx(
     for pic in os.listdir(directory):
         name, ext = os.path.splitext(pic)
         if ext.lower() in accept:
-            img = pg.image.load(os.path.join(directory, pic))
-            if img.get_alpha():
-                img = img.convert_alpha()
-            else:
-                img = img.convert()
-                img.set_colorkey(colorkey)
-            graphics[name] = img
+            graphics[name] = load_gfx(os.path.join(directory, pic), colorkey)
     return graphics
+
+
+class LazyGFX(Mapping):
+    """read-only mapping of the images in directory, an image is loaded
+    the first time it is looked up instead of all of them at import time"""
+
+    def __init__(
+        self,
+        directory,
+        colorkey=(255, 0, 255),
+        accept=(".png", ".jpg", ".bmp", ".gif"),
+    ):
+        self.directory = directory
+        self.colorkey = colorkey
+        self.accept = accept
+        self.paths = None
+        self.images = {}
+
+    def scan(self):
+        if self.paths is None:
+            self.paths = {}
+            for pic in os.listdir(self.directory):
+                name, ext = os.path.splitext(pic)
+                if ext.lower() in self.accept:
+                    self.paths[name] = os.path.join(self.directory, pic)
+        return self.paths
+
+    def __getitem__(self, name):
+        image = self.images.get(name)
+        if image is None:
+            image = load_gfx(self.scan()[name], self.colorkey)
+            self.images[name] = image
+        return image
+
+    def __iter__(self):
+        return iter(self.scan())
+
+    def __len__(self):
+        return len(self.scan())
+
+
+class AssetCache:
+    """on-disk cache of the scaled level backgrounds
+
+    every scaled image is stored as raw pixels in cache_dir and memory-mapped
+    on the next start, which skips the png decoding and scaling: the source
+    is only loaded from gfx, a LazyGFX, when its entry is missing. an entry
+    is rebuilt when the source file or the scale changes.
+    """
+
+    MANIFEST = "manifest.json"
+    LOCK = "manifest.lock"
+
+    def __init__(self, gfx, cache_dir):
+        self.gfx = gfx
+        self.cache_dir = cache_dir
+        self.manifest = None
+        self.sources = {}
+
+    def load_manifest(self):
+        self.manifest = {}
+        try:
+            with open(os.path.join(self.cache_dir, self.MANIFEST)) as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def source_info(self, name):
+        if name not in self.sources:
+            path = self.gfx.scan().get(name)
+            info = None
+            if path is not None:
+                stat = os.stat(path)
+                info = [os.path.basename(path), stat.st_mtime_ns, stat.st_size]
+            self.sources[name] = info
+        return self.sources[name]
+
+    def lookup(self, name, scale):
+        """return the entry of name scaled by scale if it is up to date"""
+        if self.manifest is None:
+            self.load_manifest()
+        entry = self.manifest.get(name + "@" + str(scale))
+        if entry is not None and entry["source"] == self.source_info(name):
+            return entry
+        return None
+
+    def map(self, name, scale):
+        """memory-map the pixels of the image name scaled by scale, return
+        (buffer, entry) or None if there is no cache. the size of the scaled
+        image is in entry["size"]"""
+        entry = self.lookup(name, scale)
+        if entry is None:
+            entry = self.save(name, scale, scale_image(self.gfx[name], scale))
+            if entry is None:
+                return None
+        try:
+            with open(os.path.join(self.cache_dir, entry["file"]), "rb") as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        return buffer, entry
+
+    def save(self, name, scale, image):
+        """write the pixels and the manifest entry of image, other processes
+        may read or fill the cache at the same time. the pixels are written
+        to a temporary file which replaces the old one, and the manifest is
+        merged with the one on disk while holding the lock file"""
+        key = name + "@" + str(scale)
+        alpha = image.get_flags() & pg.SRCALPHA
+        colorkey = image.get_colorkey()
+        entry = {
+            "source": self.source_info(name),
+            "file": key + ".bin",
+            "size": list(image.get_size()),
+            "format": "RGBA" if alpha else "RGB",
+            "colorkey": list(colorkey) if colorkey else None,
+        }
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            self.replace(entry["file"], pg.image.tostring(image, entry["format"]))
+            with open(os.path.join(self.cache_dir, self.LOCK), "a") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                self.load_manifest()
+                self.manifest[key] = entry
+                self.replace(self.MANIFEST, json.dumps(self.manifest).encode())
+        except OSError:
+            # the cache is only an optimization, a read-only tree still works
+            return None
+        return entry
+
+    def replace(self, filename, data):
+        fd, path = tempfile.mkstemp(dir=self.cache_dir, prefix=filename + ".")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(path, os.path.join(self.cache_dir, filename))
+        except OSError:
+            os.unlink(path)
+            raise
@@ -8,7 +8,7 @@ from copy import deepcopy
 from testflows.core import *
 from contextlib import contextmanager
 
-from game.source import tools
+from game.source import setup, tools
 from game.source import constants as c
 from game.source.states import main_menu, load_screen, level
 
@@ -121,8 +121,7 @@ class Control(tools.Control):
 
                 yield self
 
-                pg.display.update()
-                self.clock.tick(self.fps)
+                self.present()
 
         self.play = _main()
 
@@ -207,6 +206,7 @@ def wait_ready(self, game):
 def start(self, wait_for_ready=True):
     """Start the game."""
 
+    setup.init()
     game = Control()
     state_dict = {
         c.MAIN_MENU: main_menu.Menu(),
@@ -0,0 +1,16 @@
+import os
+import pygame as pg
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+from game.source import setup
+from game.source import constants as c
+
+setup.init(c.DISPLAY_OFFSCREEN)
+
+
+def make_sprite(x, y, width, height):
+    """a bare sprite with only a rect, shared by the collision tests"""
+    sprite = pg.sprite.Sprite()
+    sprite.rect = pg.Rect(x, y, width, height)
+    return sprite
@@ -0,0 +1,67 @@
+import numpy as np
+import pygame as pg
+import pytest
+from game.source import setup, tools
+from game.source.components import background
+
+LEVELS = ["level_1", "level_2", "level_3", "level_4"]
+
+
+def tiles_of(bg):
+    return [bg.create_tile(index) for index in range(bg.tile_num)]
+
+
+def assert_tiles_match(bg, full):
+    for index, tile in enumerate(tiles_of(bg)):
+        x = index * bg.tile_width
+        expected = full.subsurface((x, 0, tile.get_width(), bg.rect.h))
+        assert tile.get_size() == expected.get_size()
+        assert pg.image.tostring(tile, "RGB") == pg.image.tostring(expected, "RGB")
+        assert tile.get_colorkey() == full.get_colorkey()
+
+
+@pytest.mark.parametrize("name", LEVELS)
+def test_scaled_tiles_follow_full_scale(name, monkeypatch):
+    # a scaled tile may pick a neighbour source column, every column of it
+    # is found within a few pixels in the level scaled as a whole
+    monkeypatch.setattr(setup.ASSET_CACHE, "map", lambda *args: None)
+    bg = background.Background(name)
+    assert bg.mapped is None
+    full = tools.scale_image(bg.source, bg.scale)
+    pixels = pg.surfarray.array2d(full)
+    for index, tile in enumerate(tiles_of(bg)):
+        x = index * bg.tile_width
+        assert tile.get_size() == (min(bg.tile_width, bg.rect.w - x), bg.rect.h)
+        assert tile.get_colorkey() == full.get_colorkey()
+        columns = pg.surfarray.array2d(tile)
+        found = np.zeros(len(columns), bool)
+        for offset in range(-3, 4):
+            near = np.clip(np.arange(x, x + len(columns)) + offset, 0, bg.rect.w - 1)
+            found |= (columns == pixels[near]).all(axis=1)
+        assert found.all()
+
+
+@pytest.mark.parametrize("name", LEVELS[:2])
+def test_cached_tiles_match_full_scale(name, tmp_path, monkeypatch):
+    cache = tools.AssetCache(setup.GFX, str(tmp_path))
+    monkeypatch.setattr(setup, "ASSET_CACHE", cache)
+    bg = background.Background(name)
+    assert bg.mapped is not None
+    assert_tiles_match(bg, tools.scale_image(bg.source, bg.scale))
+    bg.close()
+
+
+def test_warm_cache_skips_decoding(tmp_path, monkeypatch):
+    for _ in range(2):
+        gfx = tools.LazyGFX(setup.GRAPHICS_DIR)
+        monkeypatch.setattr(setup, "GFX", gfx)
+        monkeypatch.setattr(setup, "ASSET_CACHE", tools.AssetCache(gfx, str(tmp_path)))
+        bg = background.Background("level_1")
+        tile = bg.get_tile(1)
+        bg.close()
+    # the second start found the entry and didn't load the png
+    assert "level_1" not in gfx.images
+    full = tools.scale_image(gfx["level_1"], bg.scale)
+    assert bg.rect.size == full.get_size()
+    expected = full.subsurface((bg.tile_width, 0, tile.get_width(), bg.rect.h))
+    assert pg.image.tostring(tile, "RGB") == pg.image.tostring(expected, "RGB")
@@ -0,0 +1,217 @@
+import random
+import pygame as pg
+import pytest
+from game.source import tools
+from tests.conftest import make_sprite
+
+
+def random_rect(rng, width=2000, height=600, size=90):
+    return pg.Rect(
+        rng.randint(-50, width),
+        rng.randint(-50, height),
+        rng.randint(0, size),
+        rng.randint(0, size),
+    )
+
+
+def random_group(rng, count, **kwargs):
+    return tools.Group(
+        *[make_sprite(*random_rect(rng, **kwargs)) for _ in range(count)]
+    )
+
+
+def first_collision(sprite, groups):
+    """the brute force answer, like spritecollideany on the groups in order"""
+    for group in groups:
+        other = pg.sprite.spritecollideany(sprite, group)
+        if other is not None:
+            return other
+    return None
+
+
+def change_group(rng, group, **kwargs):
+    if len(group) and rng.random() < 0.5:
+        group.remove(rng.choice(group.sprites()))
+    else:
+        group.add(make_sprite(*random_rect(rng, **kwargs)))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_x_sorted_index(seed):
+    rng = random.Random(seed)
+    group = random_group(rng, 60)
+    index = tools.XSortedIndex(group)
+    for step in range(200):
+        if step % 20 == 0:
+            change_group(rng, group)
+        left = rng.randint(-100, 2000)
+        right = left + rng.randint(0, 800)
+        sprites = index.query(left, right)
+        expected = [
+            sprite
+            for sprite in group
+            if sprite.rect.left < right and sprite.rect.right > left
+        ]
+        assert set(expected) <= set(sprites)
+        assert sprites == [sprite for sprite in group if sprite in set(sprites)]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_x_cursor(seed):
+    rng = random.Random(seed)
+    group = random_group(rng, 80)
+    cursor = tools.XCursor(group)
+    player = make_sprite(0, 300, 30, 40)
+    for step in range(1000):
+        if rng.random() < 0.02:
+            # a jump to another map
+            player.rect.x = rng.randint(-100, 2000)
+        else:
+            player.rect.x += rng.randint(-10, 10)
+        player.rect.y = rng.randint(0, 600)
+        if step % 50 == 0:
+            change_group(rng, group)
+        assert cursor.collideany(player) is pg.sprite.spritecollideany(player, group)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_spatial_hash(seed):
+    rng = random.Random(seed)
+    ground = random_group(rng, 40)
+    bricks = random_group(rng, 40)
+    sliders = random_group(rng, 5)
+    groups = (tools.Group(ground, sliders), bricks)
+    grid = tools.SpatialHash(groups, (sliders,), cell_size=43)
+    for step in range(500):
+        if step % 25 == 0:
+            change_group(rng, bricks)
+        for slider in sliders:
+            slider.rect.move_ip(rng.randint(-5, 5), rng.randint(-5, 5))
+        # a bump moves a brick up to a cell out of its registered rect
+        brick = rng.choice(bricks.sprites())
+        offset = rng.randint(-43, 43)
+        brick.rect.y += offset
+
+        sprite = make_sprite(*random_rect(rng, size=60))
+        assert grid.collideany(sprite) is first_collision(sprite, groups)
+        candidates = grid.query(sprite.rect)
+        hits = [s for group in groups for s in group if sprite.rect.colliderect(s.rect)]
+        assert set(hits) <= set(candidates)
+        brick.rect.y -= offset
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_occupancy(seed):
+    rng = random.Random(seed)
+    solids = random_group(rng, 40)
+    sliders = random_group(rng, 3)
+    groups = (solids, sliders)
+    occupancy = tools.Occupancy(groups, (sliders,))
+    for step in range(300):
+        choice = rng.random()
+        if choice < 0.2:
+            sprite = rng.choice(solids.sprites())
+            occupancy.lift(sprite)
+            sprite.rect.move_ip(rng.randint(-30, 30), rng.randint(-30, 30))
+        elif choice < 0.4 and occupancy.lifted:
+            occupancy.land(rng.choice(occupancy.lifted))
+        elif choice < 0.5:
+            change_group(rng, solids)
+        for slider in sliders:
+            slider.rect.move_ip(rng.randint(-5, 5), rng.randint(-5, 5))
+
+        for _ in range(5):
+            sprite = make_sprite(*random_rect(rng, size=60))
+            assert occupancy.collide(sprite.rect) == (
+                first_collision(sprite, groups) is not None
+            )
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sweep_and_prune(seed):
+    rng = random.Random(seed)
+    enemies = random_group(rng, 50)
+    index = tools.SweepAndPrune(enemies)
+    for step in range(200):
+        index.invalidate()
+        for enemy in enemies:
+            enemy.rect.x += rng.randint(-6, 6)
+        sprite = make_sprite(*random_rect(rng, size=60))
+        # before update() it falls back to checking every sprite
+        assert index.collideany(sprite) is pg.sprite.spritecollideany(sprite, enemies)
+        index.update()
+        if step % 20 == 0:
+            change_group(rng, enemies)
+        for _ in range(5):
+            sprite = make_sprite(*random_rect(rng, size=60))
+            assert index.collideany(sprite) is pg.sprite.spritecollideany(
+                sprite, enemies
+            )
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_dirty_surface(seed):
+    rng = random.Random(seed)
+    screen = pg.Surface((400, 300)).convert()
+    dirty = tools.DirtySurface(screen)
+    images = []
+    for color in ((255, 0, 0), (0, 255, 0), (0, 0, 255)):
+        image = pg.Surface((20, 30)).convert()
+        image.fill(color)
+        images.append(image)
+    sprites = [
+        [rng.choice(images), [rng.randint(0, 380), rng.randint(0, 270)]]
+        for _ in range(7)
+    ]
+
+    for frame in range(60):
+        shown = screen.copy()
+        for sprite in sprites:
+            if rng.random() < 0.2:
+                sprite[1][0] += rng.randint(-3, 3)
+                sprite[1][1] += rng.randint(-3, 3)
+            if rng.random() < 0.05:
+                sprite[0] = rng.choice(images)
+        dirty.fill((0, 0, 0))
+        for image, position in sprites:
+            dirty.blit(image, position)
+
+        rects = dirty.get_dirty_rects()
+        if rects is None:
+            continue
+        # updating only the dirty rects of the shown frame gives the new one
+        for rect in rects:
+            shown.blit(screen, rect, rect)
+        assert pg.image.tostring(shown, "RGB") == pg.image.tostring(screen, "RGB")
+
+
+def test_dirty_surface_group_draw():
+    screen = pg.Surface((400, 300)).convert()
+    dirty = tools.DirtySurface(screen)
+    sprite = make_sprite(10, 10, 20, 20)
+    sprite.image = pg.Surface((20, 20)).convert()
+    sprite.image.fill((255, 0, 0))
+    group = pg.sprite.Group(sprite)
+    for x in (10, 50):
+        sprite.rect.x = x
+        dirty.fill((0, 0, 0))
+        group.draw(dirty)
+        rects = dirty.get_dirty_rects()
+    # Group.draw goes through blits, both the old and the new place are dirty
+    assert sorted(tuple(rect) for rect in rects) == [(10, 10, 20, 20), (50, 10, 20, 20)]
+
+
+def test_dirty_surface_untracked_call():
+    screen = pg.Surface((400, 300)).convert()
+    dirty = tools.DirtySurface(screen)
+    for frame in range(2):
+        dirty.fill((0, 0, 0))
+        dirty.get_dirty_rects()
+    dirty.fill((0, 0, 0))
+    dirty.set_at((5, 5), (255, 255, 255))
+    assert dirty.get_dirty_rects() is None
+    # the next frame covers the pixel again
+    dirty.fill((0, 0, 0))
+    assert dirty.get_dirty_rects() is None
+    dirty.fill((0, 0, 0))
+    assert dirty.get_dirty_rects() == []
@@ -0,0 +1,55 @@
+import numpy as np
+import pygame as pg
+from game.source import env, tools
+from game.source import constants as c
+
+
+def random_keys(seed, frames, num_envs):
+    rng = np.random.default_rng(seed)
+    keys = rng.random((frames, 1, len(env.KEY_NAMES))) < 0.3
+    # mostly run right, so the level scrolls
+    keys[:, :, env.KEY_NAMES.index("right")] = rng.random((frames, 1)) < 0.8
+    keys[:, :, env.KEY_NAMES.index("left")] = False
+    return np.repeat(keys, num_envs, axis=1)
+
+
+def test_array_keys():
+    row = np.zeros(len(env.KEY_NAMES), bool)
+    row[env.KEY_NAMES.index("jump")] = True
+    keys = env.ArrayKeys(row)
+    assert keys[tools.keybinding["jump"]] is True
+    assert keys[tools.keybinding["right"]] is False
+    # keys which aren't in KEY_NAMES are never pressed
+    assert keys[pg.K_ESCAPE] is False
+
+
+def test_reset_and_step_shapes():
+    envs = env.VecEnv(3, pixels=True)
+    observations = envs.reset()
+    assert observations.shape == (3, len(env.OBSERVATION_NAMES))
+    keys = np.zeros((3, len(env.KEY_NAMES)), bool)
+    observations, rewards, dones, frames = envs.step(keys)
+    assert observations.shape == (3, len(env.OBSERVATION_NAMES))
+    assert rewards.shape == (3, len(env.REWARD_NAMES))
+    assert dones.shape == (3,) and dones.dtype == bool
+    assert frames.shape == (3, c.SCREEN_HEIGHT, c.SCREEN_WIDTH, 3)
+
+
+def test_same_actions_give_same_observations():
+    frames = 300
+    keys = random_keys(0, frames, 2)
+    first = env.VecEnv(2, max_frames=200)
+    second = env.VecEnv(2, max_frames=200)
+    first.reset()
+    second.reset()
+    start_x = first.observe()[0, env.OBSERVATION_NAMES.index("x")]
+    moved = False
+    for frame in range(frames):
+        a = first.step(keys[frame])
+        b = second.step(keys[frame])
+        for x, y in zip(a, b):
+            np.testing.assert_array_equal(x, y)
+        # both envs of one VecEnv got the same keys too
+        np.testing.assert_array_equal(a[0][0], a[0][1])
+        moved = moved or a[0][0, env.OBSERVATION_NAMES.index("x")] != start_x
+    assert moved
@@ -0,0 +1,56 @@
+import collections
+import pygame as pg
+from game.source import tools
+from game.source import constants as c
+from game.source.states import level
+
+
+def test_draw_group_keeps_image_larger_than_rect():
+    game = level.Level()
+    game.viewport = pg.Rect(100, 0, 800, 600)
+    game.static_index = {}
+    game.draw_stats = {"submitted": 0, "culled": 0}
+
+    # like an exploding fireball, the 40x40 image of a 20x20 rect which
+    # ends left of the viewport still shows its right half
+    sprite = pg.sprite.Sprite()
+    sprite.rect = pg.Rect(70, 100, 20, 20)
+    sprite.image = pg.Surface((40, 40)).convert()
+    sprite.image.fill((255, 0, 0))
+    surface = pg.Surface(game.viewport.size).convert()
+    game.draw_group(surface, pg.sprite.Group(sprite))
+
+    assert game.draw_stats["submitted"] == 1
+    assert surface.get_at((5, 110))[:3] == (255, 0, 0)
+
+
+def new_game_info(level_num=1):
+    return {
+        c.COIN_TOTAL: 0,
+        c.SCORE: 0,
+        c.LIVES: 3,
+        c.TOP_SCORE: 0,
+        c.CURRENT_TIME: 0.0,
+        c.LEVEL_NUM: level_num,
+        c.PLAYER_NAME: c.PLAYER_MARIO,
+    }
+
+
+def test_native_render_with_dirty_rects(monkeypatch):
+    monkeypatch.setattr(c, "NATIVE_RENDER", True)
+    updates = []
+    monkeypatch.setattr(pg.display, "update", lambda *args: updates.append(args))
+    control = tools.Control(
+        pg.Surface(c.SCREEN_SIZE).convert(),
+        dirty_rects=True,
+        game_clock=tools.FixedStepClock(),
+    )
+    control.fps = 0
+    control.keys = collections.defaultdict(bool)
+    control.setup_states({c.LEVEL: level.Level()}, c.LEVEL)
+    control.state.startup(0, new_game_info())
+    for frame in range(10):
+        control.update()
+        control.present()
+    # the scaled level covers the viewport, so every frame is a full update
+    assert updates == [()] * 10
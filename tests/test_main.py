@@ -0,0 +1,29 @@
+import pygame as pg
+from game.source import main, tools
+
+
+def test_headless_run_never_touches_the_display(monkeypatch):
+    frames = []
+    calls = []
+    update = tools.Control.update
+
+    def counted_update(control):
+        frames.append(control.frame)
+        update(control)
+
+    monkeypatch.setattr(tools.Control, "update", counted_update)
+    # setup.init makes a video mode once to convert the images, the frames
+    # must not show anything
+    for name in ("update", "flip", "set_caption"):
+        monkeypatch.setattr(
+            pg.display, name, lambda *args, name=name: calls.append(name)
+        )
+    main.main(["--headless", "--frames", "30"])
+    assert frames == list(range(30))
+    assert calls == []
+
+
+def test_parse_args():
+    args = main.parse_args(["--render-every", "4", "--draw-every", "0"])
+    assert (args.headless, args.render_every, args.draw_every) == (False, 4, 0)
+    assert args.frames is None
@@ -0,0 +1,93 @@
+import pygame as pg
+from game.source import tools
+from game.source.components import stuff
+
+
+class Piece(tools.Pooled, pg.sprite.Sprite):
+    def __init__(self):
+        pg.sprite.Sprite.__init__(self)
+        self.rect = pg.Rect(0, 0, 8, 8)
+
+    def reset(self, x, y):
+        self.rect.topleft = (x, y)
+
+
+def test_score_pool_reuses_free_popups():
+    pool = stuff.ScorePool(size=2)
+    free = list(pool.free)
+    pool.add(10, 20, 100)
+    assert len(pool) == 1 and len(pool.free) == 1
+    popup = next(iter(pool))
+    assert popup in free
+    assert (popup.x, popup.y, popup.score) == (10, 20, 100)
+    assert [digit.rect.x for digit in popup.digit_list] == [10, 20, 30]
+
+    pool.clear()
+    assert len(pool) == 0 and len(pool.free) == 2
+    pool.add(0, 0, 200)
+    assert next(iter(pool)) in free
+
+
+def test_score_pool_recycles_oldest_popup_when_full():
+    pool = stuff.ScorePool(size=2)
+    pool.add(0, 100, 100)
+    oldest = pool.active[0]
+    pool.add(0, 100, 200)
+    newer = pool.active[1]
+    pool.add(50, 60, 1000)
+    assert pool.active == [newer, oldest]
+    assert (oldest.x, oldest.y, oldest.score) == (50, 60, 1000)
+    assert oldest.distance == 130
+    assert len(oldest.digit_list) == 4
+
+
+def test_score_pool_update_frees_finished_popups():
+    pool = stuff.ScorePool(size=2)
+    pool.add(0, 100, 100)
+    pool.add(0, 100, 1000)
+    short, long = pool.active
+    for frame in range(26):
+        pool.update()
+    # 100 stops after 75 px, 1000 keeps going to 130 px
+    assert pool.active == [long]
+    assert short in pool.free
+    for frame in range(18):
+        pool.update()
+    assert len(pool) == 0 and len(pool.free) == 2
+
+
+def test_sprite_pool_acquire_and_reuse():
+    pool = tools.SpritePool(Piece)
+    group = pg.sprite.Group()
+    first = pool.acquire(10, 20)
+    group.add(first)
+    assert first.pool is pool
+    assert first.rect.topleft == (10, 20)
+
+    first.kill()
+    assert not first.alive() and pool.free == [first]
+    # a second kill does not put it in the pool twice
+    first.kill()
+    assert pool.free == [first]
+
+    second = pool.acquire(30, 40)
+    assert second is first
+    assert second.rect.topleft == (30, 40)
+    assert pool.stats() == {"free": 0, "created": 1, "reused": 1, "released": 1}
+
+
+def test_sprite_pool_prewarm():
+    pool = tools.SpritePool(Piece)
+    pool.prewarm(3)
+    pool.prewarm(2)
+    assert pool.stats() == {"free": 3, "created": 3, "reused": 0, "released": 0}
+    sprites = [pool.acquire(0, 0) for _ in range(4)]
+    assert len(set(sprites)) == 4
+    assert pool.stats() == {"free": 0, "created": 4, "reused": 3, "released": 0}
+
+
+def test_pooled_without_pool_just_dies():
+    sprite = Piece()
+    group = pg.sprite.Group(sprite)
+    sprite.kill()
+    assert not sprite.alive() and len(group) == 0
@@ -0,0 +1,33 @@
+import multiprocessing
+import os
+import numpy as np
+from game.source import env, rollout
+
+
+def crash(observation):
+    """an agent which kills its worker process"""
+    os._exit(3)
+
+
+def test_crash_is_isolated_to_its_rollout():
+    keys = np.zeros((40, len(env.KEY_NAMES)), bool)
+    keys[:, env.KEY_NAMES.index("right")] = True
+    rollouts = [(1, keys)] * 7
+    rollouts[3] = (1, crash)
+    runner = rollout.RolloutRunner(
+        workers=2,
+        chunk_size=2,
+        max_frames=40,
+        mp_context=multiprocessing.get_context("fork"),
+    )
+    progress = []
+    results = runner.run(rollouts, lambda done, total: progress.append(done))
+
+    outcomes = list(results["outcome"])
+    assert outcomes == [rollout.STOPPED] * 3 + [rollout.CRASHED] + [rollout.STOPPED] * 3
+    # the crasher was run once more on its own before it was given up
+    assert runner.crashes == {3: runner.retries + 1}
+    played = np.delete(np.arange(7), 3)
+    assert (results["frames"][played] == 40).all()
+    assert len(set(results["x"][played])) == 1
+    assert progress[-1] == 7
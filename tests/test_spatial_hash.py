@@ -0,0 +1,30 @@
+import pygame as pg
+from game.source import tools
+from tests.conftest import make_sprite
+
+
+def test_bottom_on_cell_boundary():
+    # the box ends exactly at the bottom of cell row 1, when it falls a few
+    # pixels below its rest height it reaches row 2 while it is still
+    # registered with its rest rect
+    size = 43
+    box = make_sprite(0, size, size, size)
+    group = tools.Group(box)
+    grid = tools.SpatialHash((group,), cell_size=size)
+    box.rect.y += 5
+
+    player = make_sprite(10, 2 * size + 1, 20, 30)
+    assert pg.sprite.spritecollideany(player, group) is box
+    assert grid.collideany(player) is box
+
+
+def test_bumped_above_its_cells():
+    size = 43
+    brick = make_sprite(size, 2 * size, size, size)
+    group = tools.Group(brick)
+    grid = tools.SpatialHash((group,), cell_size=size)
+    brick.rect.y -= 10
+
+    player = make_sprite(size + 5, 2 * size - 30, 20, 21)
+    assert pg.sprite.spritecollideany(player, group) is brick
+    assert grid.collideany(player) is brick
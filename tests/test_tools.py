@@ -0,0 +1,36 @@
+import pygame as pg
+from game.source import tools
+from game.source import constants as c
+from game.source.components import stuff
+
+
+class Walker(tools.StateMachine):
+    __slots__ = ("_state",)
+    state_methods = {c.WALK: "walking"}
+
+    def walking(self):
+        self.state = c.JUMP
+
+
+def test_state_time_goes_to_the_state_which_ran(monkeypatch):
+    monkeypatch.setattr(c, "PROFILE_STATES", True)
+    monkeypatch.setattr(tools, "STATE_TIMES", {})
+    walker = Walker()
+    walker.state = c.WALK
+    walker.handle_state()
+    assert walker.state == c.JUMP
+    assert list(tools.STATE_TIMES) == [("Walker", "walk")]
+    # no handler for jump, nothing is timed
+    walker.handle_state()
+    assert list(tools.STATE_TIMES) == [("Walker", "walk")]
+
+
+def test_record_in_plain_group():
+    collider = stuff.Collider(0, 0, 10, 10, c.MAP_GROUND)
+    group = pg.sprite.Group(collider)
+    # a Group updates every member, a Record has nothing to do
+    group.update()
+    collider.kill()
+    assert group.has(collider)
+    group.remove(collider)
+    assert len(group) == 0